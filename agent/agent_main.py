@@ -9,8 +9,9 @@ import logging
 import signal
 import sys
 import os
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 import numpy as np
 
 # Add project root to path
@@ -33,6 +34,16 @@ class VoxtralAgent:
         self.voice_processor = None
         self.is_running = False
         self.shutdown_event = asyncio.Event()
+        self.partial_transcript = ""
+        # Last utterance whose final transcript has started; its late partials are dropped
+        self._final_utterance = 0
+        
+        # Workflow run started early from a partial transcript: (transcript, task)
+        self._speculative: Optional[Tuple[str, asyncio.Task]] = None
+        
+        # Voice settings used on every transcription
+        self._voice_cfg = config.get("voice", {}) or {}
+        self._hush_re = re.compile(re.escape(self._voice_cfg.get("hush_word", "__stop__")), re.IGNORECASE)
         
     async def initialize(self):
         """Initialize all components"""
@@ -51,38 +62,101 @@ class VoxtralAgent:
             logger.error(f"Failed to initialize agent: {e}")
             raise
     
-    async def _handle_transcription(self, audio_data: np.ndarray, sample_rate: int):
-        """Handle transcribed audio from voice processor"""
+    async def _handle_transcription(self, audio_data: np.ndarray, sample_rate: int, is_final: bool = True,
+                                    utterance: int = 0):
+        """Handle transcribed audio from voice processor
+        
+        Partial transcripts (is_final=False) arrive while the user is still speaking;
+        they update the live transcript, catch the hush word early and may start the
+        workflow speculatively. The final transcript reuses that run if it matches.
+        """
         try:
-            logger.info("Processing audio transcription...")
+            if is_final:
+                logger.info("Processing audio transcription...")
+                self._final_utterance = max(self._final_utterance, utterance)
             
             # Transcribe audio using VLLM
             transcript = await vllm_handler.transcribe_audio(audio_data, sample_rate)
             
+            # A partial that finished after its utterance's final started is stale
+            if not is_final and 0 < utterance <= self._final_utterance:
+                logger.debug("Dropping stale partial transcription")
+                return
+            
             if not transcript.strip():
                 logger.debug("Empty transcription, ignoring")
                 return
             
-            logger.info(f"Transcription: {transcript}")
+            if is_final:
+                logger.info("Transcription: %s", transcript)
+                self.partial_transcript = ""
+            else:
+                logger.debug("Partial transcription: %s", transcript)
+                self.partial_transcript = transcript
             
             # Check for hush word
-            hush_word = config.get("voice", {}).get("hush_word", "__stop__")
-            if hush_word in transcript.lower():
+            if self._hush_re.search(transcript):
                 logger.info("Hush word detected, stopping recording")
+                self._cancel_speculative()
                 self.voice_processor.force_stop_recording()
                 return
             
-            # Process through LangGraph workflow
-            result = await voxtral_workflow.process_transcript(transcript)
+            if not is_final:
+                self._maybe_start_speculative(transcript)
+                return
+            
+            # Process through LangGraph workflow, reusing a matching speculative run
+            result = await self._take_speculative(transcript)
+            if result is None:
+                result = await voxtral_workflow.process_transcript(transcript)
             
-            logger.info(f"Agent response: {result['response']}")
+            logger.info("Agent response: %s", result['response'])
             
             # Log tools used
             if result['tools_used']:
-                logger.info(f"Tools used: {', '.join(result['tools_used'])}")
+                logger.info("Tools used: %s", ", ".join(result['tools_used']))
             
         except Exception as e:
-            logger.error(f"Transcription handling error: {e}")
+            logger.error("Transcription handling error: %s", e)
+    
+    def _maybe_start_speculative(self, transcript: str):
+        """Start the workflow on a partial transcript that ends a sentence
+        
+        Only transcripts the workflow would answer without tools or typing are
+        started early, so a discarded run has no side effects.
+        """
+        transcript = transcript.strip()
+        if not transcript.endswith((".", "?", "!")):
+            return
+        if self._speculative is not None and self._speculative[0] == transcript:
+            return
+        if not voxtral_workflow.is_side_effect_free(transcript):
+            return
+        
+        self._cancel_speculative()
+        task = asyncio.create_task(voxtral_workflow.process_transcript(transcript))
+        self._speculative = (transcript, task)
+    
+    async def _take_speculative(self, transcript: str) -> Optional[dict]:
+        """Return the speculative result if it was started on this transcript"""
+        if self._speculative is None:
+            return None
+        
+        spec_transcript, task = self._speculative
+        self._speculative = None
+        
+        if spec_transcript != transcript.strip():
+            task.cancel()
+            return None
+        
+        logger.debug("Reusing speculative workflow run")
+        return await task
+    
+    def _cancel_speculative(self):
+        """Cancel any in-flight speculative workflow run"""
+        if self._speculative is not None:
+            self._speculative[1].cancel()
+            self._speculative = None
     
     async def start(self):
         """Start the agent"""
@@ -101,7 +175,7 @@ class VoxtralAgent:
             
             logger.info("Voxtral Agent is now listening for voice input")
             logger.info("Speak naturally - the agent will transcribe and respond")
-            logger.info(f"Say '{config.get('voice', {}).get('hush_word', '__stop__')}' to stop current recording")
+            logger.info(f"Say '{self._voice_cfg.get('hush_word', '__stop__')}' to stop current recording")
             
             # Wait for shutdown signal
             await self.shutdown_event.wait()
@@ -120,6 +194,7 @@ class VoxtralAgent:
         logger.info("Stopping Voxtral Agent...")
         
         self.is_running = False
+        self._cancel_speculative()
         
         # Stop voice processor
         if self.voice_processor:
@@ -140,6 +215,7 @@ class VoxtralAgent:
         status = {
             "running": self.is_running,
             "voice_processor": None,
+            "partial_transcript": self.partial_transcript,
             "vllm_handler": "initialized" if vllm_handler.session else "not_initialized"
         }
         
@@ -169,7 +245,7 @@ if __name__ == "__main__":
     vllm_endpoint = config.get("vllm_endpoint", "http://localhost:8000/v1")
     logger.info(f"Expecting VLLM server at: {vllm_endpoint}")
     logger.info("Make sure to start VLLM server first:")
-    logger.info("vllm serve mistralai/Voxtral-Mini-3B-2507 --tokenizer_mode mistral --config_format mistral --load_format mistral")
+    logger.info("vllm serve mistralai/Voxtral-Mini-3B-2507 --tokenizer_mode mistral --config_format mistral --load_format mistral --enable_prefix_caching")
     
     # Run the agent
     asyncio.run(main())
\ No newline at end of file
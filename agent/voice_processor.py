@@ -8,65 +8,136 @@ import asyncio
 import logging
 import numpy as np
 import sounddevice as sd
-import threading
 import time
 from typing import Optional, Callable, Any
-from collections import deque
 import webrtcvad
 from config.settings import config
+from models.audio_utils import to_pcm16
 
 logger = logging.getLogger(__name__)
 
+# Try to import Numba for the per-frame energy kernel
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _energy_above(frame, thr_sq):
+        """Fused sum-of-squares check: rms > t  <=>  sum(x^2) > t^2 * n"""
+        s = 0.0
+        for i in range(frame.shape[0]):
+            s += frame[i] * frame[i]
+        return s > thr_sq * frame.shape[0]
+else:
+    def _energy_above(frame, thr_sq):
+        """Sum-of-squares check: rms > t  <=>  sum(x^2) > t^2 * n"""
+        return float(np.dot(frame, frame)) > thr_sq * frame.shape[0]
+
 class VoiceProcessor:
-    """Handles real-time voice processing with silence detection and hush word support"""
+    """Handles real-time voice processing with silence detection and hush word support
+    
+    The transcription callback receives int16 PCM samples, the sample rate,
+    is_final and the utterance number shared by that utterance's partials and final.
+    """
     
     def __init__(self, transcription_callback: Optional[Callable] = None):
         self.transcription_callback = transcription_callback
         self.is_recording = False
         self.is_listening = False
         
+        voice_cfg = config.get("voice", {}) or {}
+        
         # Audio configuration
-        self.sample_rate = config.get("voice", {}).get("sample_rate", 16000)
-        self.chunk_size = config.get("voice", {}).get("chunk_size", 1024)
-        self.channels = config.get("voice", {}).get("channels", 1)
+        self.sample_rate = voice_cfg.get("sample_rate", 16000)
+        self.chunk_size = voice_cfg.get("chunk_size", 1024)
+        self.channels = voice_cfg.get("channels", 1)
         
         # Voice activity detection
         self.vad = webrtcvad.Vad(2)  # Aggressiveness level 0-3
-        self.silence_threshold = config.get("voice", {}).get("silence_threshold", 0.01)
-        self.silence_duration = config.get("voice", {}).get("silence_duration", 2.0)
-        self.hush_word = config.get("voice", {}).get("hush_word", "__stop__")
+        self.silence_threshold = voice_cfg.get("silence_threshold", 0.01)
+        # Trailing silence that ends an utterance (VAD endpoint)
+        self.end_silence = voice_cfg.get("end_silence", 0.4)
+        self.hush_word = voice_cfg.get("hush_word", "__stop__")
+        self.partial_interval = voice_cfg.get("partial_interval", 1.0)
         
         # Audio buffers
-        self.audio_buffer = deque(maxlen=int(self.sample_rate * 30))  # 30 seconds max
-        self.recording_buffer = []
+        # Audio is captured in whole 30 ms VAD frames so chunks never need reassembly
+        self._vad_frame = int(self.sample_rate * 0.03)
+        self._blocksize = self._vad_frame * max(1, self.chunk_size // self._vad_frame)
+        
+        # Channel downmix is fixed by config, so pick it once
+        if self.channels == 1:
+            self._mix = self._mix_mono
+        elif self.channels == 2:
+            self._mix = self._mix_stereo
+        else:
+            self._mix = self._mix_multi
+        
+        # Recording buffer: preallocated for 30 seconds, doubled when exceeded
+        self._rec_cap = int(self.sample_rate * 30)
+        self._rec_buf = np.empty(self._rec_cap, dtype=np.float32)
+        self._rec_len = 0
+        
+        # Streaming partials: emit the accumulated recording every partial_interval seconds
+        self._partial_samples = int(self.sample_rate * self.partial_interval)
+        self._last_emit_len = 0
+        self._partial_task: Optional[asyncio.Task] = None
+        self._utterance = 0
+        
+        # VAD scratch buffers; every frame is exactly _vad_frame samples (30 ms,
+        # a size WebRTC VAD accepts). The int16 view is over a bytearray that is
+        # handed to webrtcvad as-is
+        self._vad_f32 = np.empty(self._vad_frame, dtype=np.float32)
+        self._vad_pcm = bytearray(self._vad_frame * 2)
+        self._vad_i16 = np.frombuffer(self._vad_pcm, dtype=np.int16)
+        self._silence_threshold_sq = float(self.silence_threshold) ** 2
+        
+        # Warm up the energy kernel so JIT compilation doesn't hit the first frame
+        _energy_above(np.zeros(self._vad_frame, dtype=np.float32), self._silence_threshold_sq)
         
         # State tracking
         self.last_voice_time = 0
         self.recording_start_time = 0
-        self.push_to_talk = config.get("voice", {}).get("push_to_talk", False)
-        self.continuous_mode = config.get("voice", {}).get("continuous_mode", True)
+        self.push_to_talk = voice_cfg.get("push_to_talk", False)
+        self.continuous_mode = voice_cfg.get("continuous_mode", True)
         
-        # Threading
-        self.audio_thread = None
-        self.processing_thread = None
-        self.stop_event = threading.Event()
+        # Asyncio pipeline: the sounddevice callback hands chunks to the event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._audio_q: Optional[asyncio.Queue] = None
+        self._stream = None
+        self._processing_task: Optional[asyncio.Task] = None
+        self._dropped_samples = 0
+        self._last_drop_warning = 0.0
         
     def start_listening(self):
-        """Start the voice processing system"""
+        """Start the voice processing system (must be called from the event loop)"""
         if self.is_listening:
             logger.warning("Voice processor already listening")
             return
         
-        self.is_listening = True
-        self.stop_event.clear()
+        self._loop = asyncio.get_running_loop()
+        self._audio_q = asyncio.Queue(maxsize=256)
         
-        # Start audio capture thread
-        self.audio_thread = threading.Thread(target=self._audio_capture_loop, daemon=True)
-        self.audio_thread.start()
+        try:
+            self._stream = sd.InputStream(
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype=np.float32,
+                blocksize=self._blocksize,
+                callback=self._audio_callback
+            )
+            self._stream.start()
+            logger.info(f"Audio stream started: {self.sample_rate}Hz, {self.channels} channel(s)")
+        except Exception as e:
+            logger.error(f"Audio capture error: {e}")
+            self._stream = None
+            return
         
-        # Start processing thread
-        self.processing_thread = threading.Thread(target=self._processing_loop, daemon=True)
-        self.processing_thread.start()
+        self.is_listening = True
+        self._processing_task = self._loop.create_task(self._process_task())
         
         logger.info("Voice processor started")
     
@@ -76,115 +147,168 @@ class VoiceProcessor:
             return
         
         self.is_listening = False
-        self.stop_event.set()
         
-        # Wait for threads to finish
-        if self.audio_thread and self.audio_thread.is_alive():
-            self.audio_thread.join(timeout=2)
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception as e:
+                logger.warning(f"Error closing audio stream: {e}")
+            self._stream = None
         
-        if self.processing_thread and self.processing_thread.is_alive():
-            self.processing_thread.join(timeout=2)
+        if self._processing_task is not None:
+            self._processing_task.cancel()
+            self._processing_task = None
         
         logger.info("Voice processor stopped")
     
-    def _audio_capture_loop(self):
-        """Main audio capture loop"""
-        try:
-            with sd.InputStream(
-                samplerate=self.sample_rate,
-                channels=self.channels,
-                dtype=np.float32,
-                blocksize=self.chunk_size,
-                callback=self._audio_callback
-            ) as stream:
-                logger.info(f"Audio stream started: {self.sample_rate}Hz, {self.channels} channel(s)")
-                
-                while not self.stop_event.wait(0.1):
-                    pass  # Keep stream alive
-                    
-        except Exception as e:
-            logger.error(f"Audio capture error: {e}")
-    
     def _audio_callback(self, indata, frames, time, status):
-        """Audio input callback"""
+        """Audio input callback (runs on the PortAudio thread)"""
         if status:
-            logger.warning(f"Audio callback status: {status}")
+            logger.warning("Audio callback status: %s", status)
         
-        # Convert to mono if needed
-        if indata.shape[1] > 1:
-            audio_data = np.mean(indata, axis=1)
-        else:
-            audio_data = indata[:, 0]
+        # Convert to mono; the result must own its memory because sounddevice
+        # reuses the callback buffer
+        audio_data = self._mix(indata)
         
-        # Add to buffer
-        self.audio_buffer.extend(audio_data)
+        # Hand the chunk over to the event loop
+        try:
+            self._loop.call_soon_threadsafe(self._enqueue_audio, audio_data)
+        except RuntimeError:
+            pass  # Event loop already closed during shutdown
+    
+    def _mix_mono(self, indata: np.ndarray) -> np.ndarray:
+        """Copy the single input channel"""
+        return indata[:, 0].copy()
+    
+    def _mix_stereo(self, indata: np.ndarray) -> np.ndarray:
+        """Average two channels in float32 without a float64 temporary"""
+        mixed = np.add(indata[:, 0], indata[:, 1])
+        mixed *= 0.5
+        return mixed
+    
+    def _mix_multi(self, indata: np.ndarray) -> np.ndarray:
+        """Average any number of channels"""
+        return np.mean(indata, axis=1, dtype=np.float32)
     
-    def _processing_loop(self):
-        """Main processing loop for voice activity detection"""
-        frame_duration = 30  # ms
-        frame_size = int(self.sample_rate * frame_duration / 1000)
+    def _enqueue_audio(self, audio_data: np.ndarray):
+        """Queue a captured chunk, dropping the oldest one when full"""
+        if self._audio_q.full():
+            dropped = self._audio_q.get_nowait()
+            self._dropped_samples += dropped.shape[0]
+            
+            # Processing fell behind capture; warn at most once per second
+            now = time.monotonic()
+            if now - self._last_drop_warning >= 1.0:
+                self._last_drop_warning = now
+                logger.warning("Audio queue overflow, %d samples dropped so far", self._dropped_samples)
+        self._audio_q.put_nowait(audio_data)
+    
+    async def _process_task(self):
+        """Main processing task for voice activity detection"""
+        frame_size = self._vad_frame
         
-        while not self.stop_event.is_set():
+        while self.is_listening:
             try:
-                # Check if we have enough audio data
-                if len(self.audio_buffer) < frame_size:
-                    time.sleep(0.01)
-                    continue
-                
-                # Extract frame
-                frame = np.array([self.audio_buffer.popleft() for _ in range(frame_size)])
-                
-                # Voice activity detection
-                is_speech = self._detect_voice_activity(frame)
-                current_time = time.time()
+                # Wait for the next captured chunk (a whole number of VAD frames)
+                chunk = await self._audio_q.get()
+                n_frames = chunk.shape[0] // frame_size
                 
-                if is_speech:
-                    self.last_voice_time = current_time
-                    
-                    if not self.is_recording:
-                        self._start_recording()
-                    
-                    # Add frame to recording buffer
-                    self.recording_buffer.extend(frame)
-                
-                elif self.is_recording:
-                    # Check for silence timeout
-                    silence_duration = current_time - self.last_voice_time
-                    
-                    if silence_duration >= self.silence_duration:
-                        self._stop_recording()
-                    else:
-                        # Continue recording during short silences
-                        self.recording_buffer.extend(frame)
+                for frame in chunk[:n_frames * frame_size].reshape(n_frames, frame_size):
+                    self._handle_frame(frame)
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Processing loop error: {e}")
-                time.sleep(0.1)
+                logger.error("Processing loop error: %s", e)
+                await asyncio.sleep(0.1)
+    
+    def _handle_frame(self, frame: np.ndarray):
+        """Run voice activity detection on one frame and update recording state"""
+        # Voice activity detection
+        is_speech = self._detect_voice_activity(frame)
+        current_time = time.time()
+        
+        if is_speech:
+            self.last_voice_time = current_time
+            
+            if not self.is_recording:
+                self._start_recording()
+            
+            # Add frame to recording buffer
+            self._append_recording(frame)
+            self._maybe_emit_partial()
+        
+        elif self.is_recording:
+            # Check for end of utterance
+            silence_duration = current_time - self.last_voice_time
+            
+            if silence_duration >= self.end_silence:
+                self._stop_recording()
+            else:
+                # Continue recording during short silences
+                self._append_recording(frame)
+    
+    def _maybe_emit_partial(self):
+        """Schedule a partial transcription once another interval of audio has accumulated"""
+        if self._partial_samples <= 0 or not self.transcription_callback:
+            return
+        if self._rec_len - self._last_emit_len < self._partial_samples:
+            return
+        if self._partial_task is not None and not self._partial_task.done():
+            return  # Previous partial still in flight
+        
+        self._last_emit_len = self._rec_len
+        audio_data = to_pcm16(self._rec_buf[:self._rec_len])
+        self._partial_task = self._loop.create_task(self._emit_partial(audio_data, self._utterance))
+    
+    async def _emit_partial(self, audio_data: np.ndarray, utterance: int):
+        """Send the recording so far for a partial transcription"""
+        try:
+            await self.transcription_callback(audio_data, self.sample_rate, is_final=False,
+                                              utterance=utterance)
+        except Exception as e:
+            logger.error("Partial transcription error: %s", e)
+    
+    def _append_recording(self, frame: np.ndarray):
+        """Append a frame to the recording buffer"""
+        n = frame.shape[0]
+        if self._rec_len + n > self._rec_cap:
+            self._grow_rec(self._rec_len + n)
+        self._rec_buf[self._rec_len:self._rec_len + n] = frame
+        self._rec_len += n
+    
+    def _grow_rec(self, required: int):
+        """Grow the recording buffer by doubling until it fits required samples"""
+        new_cap = self._rec_cap
+        while new_cap < required:
+            new_cap *= 2
+        self._rec_buf = np.resize(self._rec_buf, new_cap)
+        self._rec_cap = new_cap
     
     def _detect_voice_activity(self, frame: np.ndarray) -> bool:
         """Detect voice activity in audio frame"""
         try:
-            # Convert to 16-bit PCM for WebRTC VAD
-            pcm_frame = (frame * 32767).astype(np.int16).tobytes()
-            
-            # WebRTC VAD requires specific frame sizes
-            if len(pcm_frame) != frame.shape[0] * 2:
-                return False
+            # Convert to 16-bit PCM for WebRTC VAD using the reusable scratch buffers
+            np.multiply(frame, 32767.0, out=self._vad_f32)
+            np.rint(self._vad_f32, out=self._vad_f32)
+            np.clip(self._vad_f32, -32768, 32767, out=self._vad_f32)
+            self._vad_i16[:] = self._vad_f32
             
             # Use WebRTC VAD
-            is_speech = self.vad.is_speech(pcm_frame, self.sample_rate)
+            is_speech = self.vad.is_speech(self._vad_pcm, self.sample_rate)
             
             # Also check RMS energy as backup
-            rms_energy = np.sqrt(np.mean(frame ** 2))
-            energy_speech = rms_energy > self.silence_threshold
-            
-            return is_speech or energy_speech
+            return is_speech or self._energy_above_threshold(frame)
             
         except Exception as e:
-            logger.debug(f"VAD error: {e}")
+            logger.debug("VAD error: %s", e)
             # Fallback to energy-based detection
-            rms_energy = np.sqrt(np.mean(frame ** 2))
-            return rms_energy > self.silence_threshold
+            return self._energy_above_threshold(frame)
+    
+    def _energy_above_threshold(self, frame: np.ndarray) -> bool:
+        """Check RMS energy against the silence threshold"""
+        return bool(_energy_above(frame, self._silence_threshold_sq))
     
     def _start_recording(self):
         """Start recording audio"""
@@ -193,7 +317,9 @@ class VoiceProcessor:
         
         self.is_recording = True
         self.recording_start_time = time.time()
-        self.recording_buffer = []
+        self._utterance += 1
+        self._rec_len = 0
+        self._last_emit_len = 0
         
         logger.debug("Started recording")
     
@@ -205,32 +331,51 @@ class VoiceProcessor:
         self.is_recording = False
         recording_duration = time.time() - self.recording_start_time
         
-        logger.debug(f"Stopped recording ({recording_duration:.2f}s)")
+        logger.debug("Stopped recording (%.2fs)", recording_duration)
+        
+        # A partial still in flight must not land after the final transcript
+        # (a hush word found by the partial itself stops recording from inside it)
+        partial = self._partial_task
+        self._partial_task = None
+        if partial is not None and partial is not asyncio.current_task():
+            partial.cancel()
         
         # Process the recorded audio
-        if len(self.recording_buffer) > 0:
-            audio_data = np.array(self.recording_buffer)
-            asyncio.create_task(self._process_audio(audio_data))
+        end = self._trimmed_length()
+        if end > 0:
+            audio_data = to_pcm16(self._rec_buf[:end])
+            self._loop.create_task(self._process_audio(audio_data, self._utterance))
+        
+        self._rec_len = 0
+    
+    def _trimmed_length(self) -> int:
+        """Length of the recording with trailing silence trimmed to a 100 ms tail"""
+        audio = self._rec_buf[:self._rec_len]
+        loud = np.abs(audio[::-1]) > self.silence_threshold
+        if not loud.any():
+            return self._rec_len
         
-        self.recording_buffer = []
+        last = self._rec_len - int(np.argmax(loud))
+        return min(self._rec_len, last + int(0.1 * self.sample_rate))
     
-    async def _process_audio(self, audio_data: np.ndarray):
-        """Process recorded audio for transcription"""
+    async def _process_audio(self, audio_data: np.ndarray, utterance: int):
+        """Process recorded audio (int16 PCM) for transcription"""
         try:
             # Check minimum duration
             duration = len(audio_data) / self.sample_rate
             if duration < 0.5:  # Ignore very short recordings
-                logger.debug(f"Ignoring short recording ({duration:.2f}s)")
+                logger.debug("Ignoring short recording (%.2fs)", duration)
                 return
             
-            logger.info(f"Processing audio ({duration:.2f}s, {len(audio_data)} samples)")
+            logger.info("Processing audio (%.2fs, %d samples)", duration, len(audio_data))
             
             # Call transcription callback if provided
             if self.transcription_callback:
-                await self.transcription_callback(audio_data, self.sample_rate)
+                await self.transcription_callback(audio_data, self.sample_rate, is_final=True,
+                                                  utterance=utterance)
                 
         except Exception as e:
-            logger.error(f"Audio processing error: {e}")
+            logger.error("Audio processing error: %s", e)
     
     def force_stop_recording(self):
         """Force stop current recording (hush word functionality)"""
@@ -251,6 +396,7 @@ class VoiceProcessor:
             "push_to_talk": self.push_to_talk,
             "continuous_mode": self.continuous_mode,
             "sample_rate": self.sample_rate,
-            "buffer_size": len(self.audio_buffer),
+            "dropped_samples": self._dropped_samples,
+            "buffer_size": self._audio_q.qsize() * self._blocksize if self._audio_q else 0,
             "recording_duration": time.time() - self.recording_start_time if self.is_recording else 0
         }
\ No newline at end of file
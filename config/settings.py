@@ -7,18 +7,40 @@ Enhanced with production-ready error handling from previous voice-control system
 
 import os
 import yaml
+import hashlib
+import atexit
+import queue
 import logging
+import logging.handlers
 from pathlib import Path
 from typing import Dict, Any, Optional
 import tempfile
 import shutil
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+
+# Prefer the libyaml-backed dumper when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
+_MISSING = object()
+
 class SimpleConfig:
     """Simple configuration class that works as a dictionary-like object"""
     
     def __init__(self, config_path: str = "config/voxtral.yaml"):
         self.config_path = config_path
         self.data = self._load_config()
+        self._lookup_cache: Dict[str, Any] = {}
+        self._dirty = False
+        self._log_listener: Optional[logging.handlers.QueueListener] = None
         
         # Create user config directory for production use
         self.user_config_dir = Path.home() / ".local/share/voxtral"
@@ -32,8 +54,18 @@ class SimpleConfig:
         """Load configuration from YAML file"""
         if os.path.exists(self.config_path):
             try:
-                with open(self.config_path, 'r') as f:
-                    return yaml.safe_load(f) or {}
+                with open(self.config_path, 'rb') as f:
+                    raw = f.read()
+                # Keyed on content, so same-mtime edits or restored files never hit
+                digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                
+                cached = self._load_cached_config(digest)
+                if cached is not None:
+                    return cached
+                
+                data = yaml.safe_load(raw) or {}
+                self._write_cached_config(digest, data)
+                return data
             except Exception as e:
                 logging.warning(f"Failed to load config from {self.config_path}: {e}")
                 return self._get_default_config()
@@ -41,6 +73,38 @@ class SimpleConfig:
             logging.info(f"Config file {self.config_path} not found, using defaults")
             return self._get_default_config()
     
+    def _cache_path(self) -> Path:
+        """Path of the parsed-config cache stored next to the YAML file"""
+        return Path(self.config_path).with_suffix(".cache.json")
+    
+    def _load_cached_config(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the cached config if it was parsed from YAML with this digest"""
+        try:
+            raw = self._cache_path().read_bytes()
+            cached = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get("digest") != digest:
+            return None
+        return cached.get("data")
+    
+    def _write_cached_config(self, digest: str, data: Dict[str, Any]):
+        """Write the parsed config cache (best effort, e.g. read-only installs)
+        
+        Skipped when JSON cannot reproduce the YAML data exactly (dates, tuples,
+        non-string keys), so such configs are always parsed from YAML.
+        """
+        try:
+            entry = {"digest": digest, "data": data}
+            raw = orjson.dumps(entry) if ORJSON_AVAILABLE else json.dumps(entry).encode()
+            if (orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)) != entry:
+                logging.debug("Config does not survive a JSON round trip; not caching it")
+                self._cache_path().unlink(missing_ok=True)
+                return
+            self._cache_path().write_bytes(raw)
+        except (OSError, TypeError, ValueError) as e:
+            logging.debug(f"Could not write config cache: {e}")
+    
     def _get_default_config(self) -> Dict[str, Any]:
         """Get default configuration"""
         return {
@@ -48,11 +112,12 @@ class SimpleConfig:
             "model_name": "mistralai/Voxtral-Mini-3B-2507",
             "voice": {
                 "sample_rate": 16000,
-                "chunk_size": 1024,
+                "chunk_size": 480,
                 "channels": 1,
                 "hush_word": "__stop__",
                 "silence_threshold": 0.01,
-                "silence_duration": 2.0,
+                "end_silence": 0.4,
+                "partial_interval": 1.0,
                 "push_to_talk": False,
                 "continuous_mode": True
             },
@@ -91,14 +156,22 @@ class SimpleConfig:
     
     def get(self, key: str, default=None):
         """Get configuration value with dot notation support"""
-        keys = key.split('.')
+        value = self._lookup_cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._lookup(key)
+            self._lookup_cache[key] = value
+        
+        return default if value is _MISSING else value
+    
+    def _lookup(self, key: str):
+        """Walk the dot-notation path, returning _MISSING if absent"""
         value = self.data
         
-        for k in keys:
+        for k in key.split('.'):
             if isinstance(value, dict) and k in value:
                 value = value[k]
             else:
-                return default
+                return _MISSING
         
         return value
     
@@ -113,32 +186,53 @@ class SimpleConfig:
             data = data[k]
         
         data[keys[-1]] = value
+        self._lookup_cache.clear()
+        self._dirty = True
     
     def save_config(self):
-        """Save configuration to YAML file"""
+        """Save configuration to YAML file if it changed since the last save"""
+        if not self._dirty:
+            return
+        
         os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
         try:
             with open(self.config_path, 'w') as f:
-                yaml.dump(self.data, f, default_flow_style=False, indent=2)
+                yaml.dump(self.data, f, Dumper=YamlDumper, default_flow_style=False, indent=2)
+            self._dirty = False
         except Exception as e:
             logging.error(f"Failed to save config to {self.config_path}: {e}")
     
     def setup_logging(self):
         """Setup logging configuration"""
+        if self._log_listener is not None:
+            return
+        
         log_level = self.get("log_level", "INFO")
         debug = self.get("debug", False)
         
         if debug:
             log_level = "DEBUG"
         
+        # Log records are handed to a background listener thread so file and
+        # console I/O never blocks the audio/VAD path
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [logging.FileHandler('voxtral.log'), logging.StreamHandler()]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        log_queue = queue.SimpleQueue()
         logging.basicConfig(
             level=getattr(logging, log_level.upper()),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('voxtral.log'),
-                logging.StreamHandler()
-            ]
+            format='%(message)s',
+            handlers=[logging.handlers.QueueHandler(log_queue)],
+            force=True
+        )
+        
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
         )
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
         
         # Set specific logger levels
         logging.getLogger('urllib3').setLevel(logging.WARNING)
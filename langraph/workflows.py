@@ -5,11 +5,16 @@ Orchestrates agent behavior, tool usage, and conversation flow
 """
 
 import asyncio
+import functools
 import logging
-from typing import Dict, Any, List, Optional, TypedDict, Annotated
+import re
+import sys
+from typing import Dict, Any, List, Optional, Tuple, TypedDict, Annotated
+from typing_extensions import NotRequired
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from models.vllm_handler import vllm_handler
 from tools.shell import run_shell, get_shell_tool_schema
 from tools.web_search import search_web, search_news, get_web_search_tool_schema, get_news_search_tool_schema
@@ -18,21 +23,126 @@ from config.settings import config
 
 logger = logging.getLogger(__name__)
 
+# Intent keywords used by _analyze_context, matched in a single regex pass
+_COMMAND_INDICATORS = (
+    "run", "execute", "search", "find", "open", "type", "paste",
+    "show me", "tell me", "what is", "how to", "help me"
+)
+_TYPING_INDICATORS = ("type", "write", "insert", "add", "put", "enter")
+_SEARCH_INDICATORS = ("search", "find", "look up", "google", "what is", "who is")
+
+# Intent category bits
+_COMMAND = 1
+_TYPING = 2
+_SEARCH = 4
+
+def _build_indicator_flags() -> Dict[str, int]:
+    """Map each indicator phrase to the bitmask of intent categories it signals"""
+    flags: Dict[str, int] = {}
+    for bit, indicators in (
+        (_COMMAND, _COMMAND_INDICATORS),
+        (_TYPING, _TYPING_INDICATORS),
+        (_SEARCH, _SEARCH_INDICATORS),
+    ):
+        for indicator in indicators:
+            flags[indicator] = flags.get(indicator, 0) | bit
+    return flags
+
+_INDICATOR_FLAGS = _build_indicator_flags()
+
+_INDICATOR_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(i) for i in sorted(_INDICATOR_FLAGS, key=len, reverse=True)) + r")\b"
+)
+
+@functools.lru_cache(maxsize=config.get("workflow.context_cache_size", 1024))
+def _analyze_context_cached(transcript: str) -> Tuple[bool, bool, str, str]:
+    """Classify a transcript as (should_type, is_command, intent, urgency)"""
+    flags = 0
+    for match in _INDICATOR_RE.finditer(transcript.lower()):
+        flags |= _INDICATOR_FLAGS[match.group()]
+    
+    # Search wins over typing, typing over plain commands; commands usually
+    # don't need typing
+    is_command = bool(flags & _COMMAND)
+    intent = "search" if flags & _SEARCH else "typing" if flags & _TYPING else "general"
+    should_type = not flags & _SEARCH and bool(flags & _TYPING or not flags & _COMMAND)
+    
+    return should_type, is_command, intent, "normal"
+
+# Lead-ins the model tends to put before text it was asked to type
+_RESPONSE_PREFIXES = (
+    "I'll type:", "I'll write:", "Here's the text:", "Typing:",
+    "I'll insert:", "I'll add:", "Here you go:", "Sure, I'll type:"
+)
+_MAX_PREFIX_LEN = max(len(prefix) for prefix in _RESPONSE_PREFIXES) + 1
+_PREFIX_RE = re.compile(r"^(?:" + "|".join(re.escape(prefix) for prefix in _RESPONSE_PREFIXES) + r")\s*")
+
+# Transcript words that ask for the response to be typed
+_TYPE_INTENT_RE = re.compile(r"\b(?:type|write|insert|add)\b")
+
+# API role names, interned so == on roles usually short-circuits on identity
+_USER_ROLE = sys.intern("user")
+_ASSISTANT_ROLE = sys.intern("assistant")
+
+def _extract_content(response: Any) -> str:
+    """Get the text of a completion result, which may already be a string"""
+    if isinstance(response, str):
+        return response
+    if isinstance(response, dict):
+        if "content" in response:
+            return response["content"] or ""
+        choices = response.get("choices")
+        if choices:
+            return choices[0].get("message", {}).get("content") or ""
+    return str(response)
+
+def _append_api_message(messages: List[Dict[str, str]], role: str, content: str):
+    """Append a message in API format, merging consecutive same-role messages"""
+    content = content.strip()
+    if messages and messages[-1]["role"] == role:
+        messages[-1]["content"] += "\n" + content
+    else:
+        messages.append({"role": role, "content": content})
+
 class AgentState(TypedDict):
-    """State for the Voxtral agent workflow"""
+    """State for the Voxtral agent workflow
+    
+    NotRequired keys are only written on the paths that produce them.
+    """
     messages: Annotated[List, add_messages]
+    openai_messages: List[Dict[str, str]]  # messages in API format, built incrementally
     transcript: str
     context: Dict[str, Any]
-    tools_used: List[str]
-    response: str
     should_type: bool
+    tools_used: NotRequired[List[str]]
+    response: NotRequired[str]
+    tool_calls: NotRequired[List[Dict[str, Any]]]
+    response_typed: NotRequired[bool]
+
+def _delegate_node(method_name: str):
+    """Graph node that runs `method_name` on the workflow passed in the run config
+    
+    Nodes hold no instance, so one compiled graph serves every VoxtralWorkflow;
+    each run supplies its own via config["configurable"]["workflow"].
+    """
+    async def node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        workflow = config["configurable"]["workflow"]
+        return await getattr(workflow, method_name)(state)
+    
+    node.__name__ = method_name
+    return node
 
 class VoxtralWorkflow:
     """Main workflow orchestrator for Voxtral agent"""
     
+    # The graph topology is static, so it is compiled once and shared by all
+    # instances; nodes reach the running instance through the run config
+    _compiled_graph = None
+    
     def __init__(self):
         self.graph = None
         self.tools_registry = {}
+        self._cursor_injection_enabled = bool(config.get("system", {}).get("cursor_injection", True))
         self._setup_tools()
         self._build_graph()
     
@@ -43,13 +153,16 @@ class VoxtralWorkflow:
                                   "Execute safe shell commands on Linux", 
                                   get_shell_tool_schema())
         
+        # Searches are read-only, so identical queries can reuse recent results
         vllm_handler.register_tool("search_web", search_web,
                                   "Search the web using DuckDuckGo",
-                                  get_web_search_tool_schema())
+                                  get_web_search_tool_schema(),
+                                  cache_ttl=60.0)
         
         vllm_handler.register_tool("search_news", search_news,
                                   "Search for news using DuckDuckGo",
-                                  get_news_search_tool_schema())
+                                  get_news_search_tool_schema(),
+                                  cache_ttl=60.0)
         
         typing_schemas = get_typing_tool_schemas()
         vllm_handler.register_tool("type_text", type_text,
@@ -64,178 +177,216 @@ class VoxtralWorkflow:
                                   "Open a URL in the default browser",
                                   typing_schemas["open_url"])
         
+        # Tools are static after registration, so build the schema once
+        self._tools_schema = vllm_handler.get_tools_schema()
+        
         logger.info("All tools registered with VLLM handler")
     
     def _build_graph(self):
         """Build the LangGraph workflow"""
+        if VoxtralWorkflow._compiled_graph is not None:
+            self.graph = VoxtralWorkflow._compiled_graph
+            return
+        
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("process_input", self._process_input_node)
-        workflow.add_node("agent_reasoning", self._agent_reasoning_node)
-        workflow.add_node("execute_tools", self._execute_tools_node)
-        workflow.add_node("generate_response", self._generate_response_node)
-        workflow.add_node("output_handler", self._output_handler_node)
+        workflow.add_node("process_input", _delegate_node("_process_input_node"))
+        workflow.add_node("agent_reasoning", _delegate_node("_agent_reasoning_node"))
+        workflow.add_node("generate_response", _delegate_node("_generate_response_node"))
+        workflow.add_node("output_handler", _delegate_node("_output_handler_node"))
         
         # Define edges
         workflow.set_entry_point("process_input")
         workflow.add_edge("process_input", "agent_reasoning")
-        workflow.add_conditional_edges(
-            "agent_reasoning",
-            self._should_use_tools,
-            {
-                "use_tools": "execute_tools",
-                "generate_response": "generate_response"
-            }
-        )
-        workflow.add_edge("execute_tools", "generate_response")
+        workflow.add_edge("agent_reasoning", "generate_response")
         workflow.add_edge("generate_response", "output_handler")
         workflow.add_edge("output_handler", END)
         
-        self.graph = workflow.compile()
+        self.graph = VoxtralWorkflow._compiled_graph = workflow.compile()
         logger.info("LangGraph workflow compiled successfully")
     
-    async def _process_input_node(self, state: AgentState) -> AgentState:
+    async def _process_input_node(self, state: AgentState) -> Dict[str, Any]:
         """Process the input transcript and prepare context"""
         try:
             transcript = state.get("transcript", "").strip()
             
             if not transcript:
                 logger.warning("Empty transcript received")
-                return {**state, "response": "I didn't hear anything. Could you please repeat?"}
+                return {"response": "I didn't hear anything. Could you please repeat?"}
             
             logger.info(f"Processing transcript: {transcript}")
             
             # Detect if this is a command or natural speech
             context = self._analyze_context(transcript)
             
-            # Initialize messages if not present
-            if "messages" not in state:
-                state["messages"] = []
-            
             # Add user message
-            state["messages"].append(HumanMessage(content=transcript))
+            openai_messages = state.get("openai_messages") or []
+            _append_api_message(openai_messages, _USER_ROLE, transcript)
             
             return {
-                **state,
+                "messages": [HumanMessage(content=transcript)],
+                "openai_messages": openai_messages,
                 "transcript": transcript,
                 "context": context,
-                "tools_used": [],
                 "should_type": context.get("should_type", True)
             }
             
         except Exception as e:
             logger.error(f"Input processing error: {e}")
-            return {**state, "response": f"Error processing input: {str(e)}"}
+            return {"response": f"Error processing input: {str(e)}"}
     
     def _analyze_context(self, transcript: str) -> Dict[str, Any]:
         """Analyze transcript context to determine appropriate response"""
-        transcript_lower = transcript.lower()
+        should_type, is_command, intent, urgency = _analyze_context_cached(transcript)
         
-        context = {
-            "should_type": True,
-            "is_command": False,
-            "intent": "general",
-            "urgency": "normal"
+        # Fresh dict per call since the workflow state may mutate it
+        return {
+            "should_type": should_type,
+            "is_command": is_command,
+            "intent": intent,
+            "urgency": urgency
         }
-        
-        # Detect commands
-        command_indicators = [
-            "run", "execute", "search", "find", "open", "type", "paste",
-            "show me", "tell me", "what is", "how to", "help me"
-        ]
-        
-        if any(indicator in transcript_lower for indicator in command_indicators):
-            context["is_command"] = True
-            context["should_type"] = False  # Commands usually don't need typing
-        
-        # Detect typing intent
-        typing_indicators = [
-            "type", "write", "insert", "add", "put", "enter"
-        ]
-        
-        if any(indicator in transcript_lower for indicator in typing_indicators):
-            context["intent"] = "typing"
-            context["should_type"] = True
-        
-        # Detect search intent
-        search_indicators = [
-            "search", "find", "look up", "google", "what is", "who is"
-        ]
-        
-        if any(indicator in transcript_lower for indicator in search_indicators):
-            context["intent"] = "search"
-            context["should_type"] = False
-        
-        return context
     
-    async def _agent_reasoning_node(self, state: AgentState) -> AgentState:
+    def is_side_effect_free(self, transcript: str) -> bool:
+        """Whether the workflow would answer this transcript without tools or typing"""
+        context = self._analyze_context(transcript)
+        return not context["is_command"] and context["intent"] != "typing"
+    
+    async def _agent_reasoning_node(self, state: AgentState) -> Dict[str, Any]:
         """Main agent reasoning with LLM"""
         try:
-            messages = state.get("messages", [])
             context = state.get("context", {})
             
-            # Get available tools
-            tools = vllm_handler.get_tools_schema()
+            tools = self._tools_schema
+            
+            # Stream straight to the cursor when the answer will be typed and needs no tools
+            if not context.get("is_command", False) and self._should_type_response(state):
+                response = await self._stream_and_type(state.get("openai_messages", []))
+                return {"response": response, "response_typed": True}
             
             # Generate response using VLLM
             response = await vllm_handler.chat_completion(
-                messages=[{"role": msg.type, "content": msg.content} for msg in messages],
-                tools=tools if context.get("is_command", False) else None
+                messages=state.get("openai_messages", []),
+                tools=tools if context.get("is_command", False) else None,
+                execute_tools=False
             )
             
             # Check if response contains tool usage
-            if isinstance(response, dict) and "tool_calls" in str(response):
-                state["needs_tools"] = True
-            else:
-                state["needs_tools"] = False
-                state["response"] = str(response)
+            tool_calls = self._get_tool_calls(response)
+            if tool_calls:
+                return {"tool_calls": tool_calls}
             
-            return state
+            return {"response": _extract_content(response)}
             
         except Exception as e:
             logger.error(f"Agent reasoning error: {e}")
-            return {**state, "response": f"I encountered an error while thinking: {str(e)}"}
+            return {"response": f"I encountered an error while thinking: {str(e)}"}
     
-    def _should_use_tools(self, state: AgentState) -> str:
-        """Determine if tools should be used"""
-        return "use_tools" if state.get("needs_tools", False) else "generate_response"
+    @staticmethod
+    def _get_tool_calls(response: Any) -> List[Dict[str, Any]]:
+        """Get tool calls from a completion response without serializing it"""
+        if not isinstance(response, dict):
+            return []
+        if response.get("tool_calls"):
+            return response["tool_calls"]
+        choices = response.get("choices")
+        if choices:
+            return choices[0].get("message", {}).get("tool_calls") or []
+        return []
     
-    async def _execute_tools_node(self, state: AgentState) -> AgentState:
-        """Execute any required tools"""
+    def _should_type_response(self, state: AgentState) -> bool:
+        """Whether the response should be typed at the cursor"""
+        context = state.get("context", {})
+        return (
+            state.get("should_type", True)
+            and context.get("intent") == "typing"
+            and self._cursor_injection_enabled
+            and self._wants_typed_text(state.get("transcript", ""))
+        )
+    
+    async def _stream_and_type(self, messages: List[Dict[str, str]]) -> str:
+        """Stream the completion and type it at the cursor while it is generated"""
+        chunks: asyncio.Queue = asyncio.Queue()
+        typer = asyncio.create_task(self._type_from_queue(chunks))
+        
+        parts = []
+        pending = ""
+        prefix_checked = False
         try:
-            # Tool execution is handled within the VLLM handler
-            # This node is for any additional tool coordination if needed
-            logger.info("Tools executed via VLLM handler")
-            return state
+            async for delta in vllm_handler.chat_completion_stream(messages):
+                parts.append(delta)
+                pending += delta
+                
+                # Hold back the start until a response prefix can be recognized
+                if not prefix_checked:
+                    if len(pending) < _MAX_PREFIX_LEN:
+                        continue
+                    pending = self._strip_response_prefix(pending)
+                    prefix_checked = True
+                
+                # Type whole words only
+                cut = max(pending.rfind(" "), pending.rfind("\n")) + 1
+                if cut > 0:
+                    chunks.put_nowait(pending[:cut])
+                    pending = pending[cut:]
             
-        except Exception as e:
-            logger.error(f"Tool execution error: {e}")
-            return {**state, "response": f"Error executing tools: {str(e)}"}
+            if not prefix_checked:
+                pending = self._strip_response_prefix(pending)
+            if pending:
+                chunks.put_nowait(pending)
+        finally:
+            chunks.put_nowait(None)
+            await typer
+        
+        return "".join(parts)
     
-    async def _generate_response_node(self, state: AgentState) -> AgentState:
+    async def _type_from_queue(self, chunks: asyncio.Queue):
+        """Type queued text chunks in order until None is received"""
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                return
+            typing_result = await asyncio.to_thread(type_text, chunk)
+            logger.debug(f"Typing result: {typing_result}")
+    
+    async def _generate_response_node(self, state: AgentState) -> Dict[str, Any]:
         """Generate final response"""
         try:
-            if "response" not in state or not state["response"]:
-                # Generate a response if we don't have one
-                messages = state.get("messages", [])
-                
-                response = await vllm_handler.chat_completion(
-                    messages=[{"role": msg.type, "content": msg.content} for msg in messages]
-                )
+            response = state.get("response")
+            tool_calls = state.get("tool_calls") or []
+            openai_messages = state.get("openai_messages") or []
+            update: Dict[str, Any] = {}
+            
+            if tool_calls:
+                # Execute requested tools
+                tool_results = await vllm_handler.execute_tool_calls(tool_calls)
+                update["tools_used"] = [call.get("function", {}).get("name", "unknown") for call in tool_calls]
+                logger.info(f"Tools executed via VLLM handler: {', '.join(update['tools_used'])}")
                 
-                state["response"] = str(response)
+                # Summarize tool output into the final answer (one follow-up call)
+                response = _extract_content(await vllm_handler.chat_completion(
+                    messages=openai_messages + [{"role": _USER_ROLE, "content": f"Tool results:\n{tool_results}"}]
+                ))
+            elif not response:
+                # Generate a response if we don't have one
+                response = _extract_content(await vllm_handler.chat_completion(messages=openai_messages))
             
             # Add AI message to conversation
-            state["messages"].append(AIMessage(content=state["response"]))
+            _append_api_message(openai_messages, _ASSISTANT_ROLE, response)
             
-            return state
+            update.update({
+                "response": response,
+                "messages": [AIMessage(content=response)],
+                "openai_messages": openai_messages
+            })
+            return update
             
         except Exception as e:
             logger.error(f"Response generation error: {e}")
-            return {**state, "response": f"Error generating response: {str(e)}"}
+            return {"response": f"Error generating response: {str(e)}"}
     
-    async def _output_handler_node(self, state: AgentState) -> AgentState:
+    async def _output_handler_node(self, state: AgentState) -> Dict[str, Any]:
         """Handle output - typing, speaking, or just logging"""
         try:
             response = state.get("response", "")
@@ -245,45 +396,40 @@ class VoxtralWorkflow:
             logger.info(f"Agent response: {response}")
             
             # If this is a typing intent and cursor injection is enabled
-            if should_type and context.get("intent") == "typing" and config.get("system", {}).get("cursor_injection", True):
+            if state.get("response_typed"):
+                pass  # Already typed while streaming
+            elif should_type and context.get("intent") == "typing" and self._cursor_injection_enabled:
                 # Extract text to type from response
                 text_to_type = self._extract_text_to_type(response, state.get("transcript", ""))
                 
                 if text_to_type:
                     # Use the type_text tool
-                    typing_result = type_text(text_to_type)
+                    typing_result = await asyncio.to_thread(type_text, text_to_type)
                     logger.info(f"Typing result: {typing_result}")
             
-            return state
+            return {}
             
         except Exception as e:
             logger.error(f"Output handling error: {e}")
-            return state
+            return {}
     
     def _extract_text_to_type(self, response: str, transcript: str) -> str:
         """Extract text that should be typed from the response"""
         # Simple heuristic: if the transcript contains "type" or "write"
         # and the response is not a tool execution result, type the response
-        
-        transcript_lower = transcript.lower()
-        
-        if any(word in transcript_lower for word in ["type", "write", "insert", "add"]):
-            # Remove common response prefixes
-            prefixes_to_remove = [
-                "I'll type:", "I'll write:", "Here's the text:", "Typing:",
-                "I'll insert:", "I'll add:", "Here you go:", "Sure, I'll type:"
-            ]
-            
-            text = response
-            for prefix in prefixes_to_remove:
-                if text.startswith(prefix):
-                    text = text[len(prefix):].strip()
-                    break
-            
-            return text
+        if self._wants_typed_text(transcript):
+            return self._strip_response_prefix(response)
         
         return ""
     
+    def _wants_typed_text(self, transcript: str) -> bool:
+        """Whether the transcript asks for text to be typed"""
+        return _TYPE_INTENT_RE.search(transcript.lower()) is not None
+    
+    def _strip_response_prefix(self, text: str) -> str:
+        """Remove common response prefixes"""
+        return _PREFIX_RE.sub("", text, count=1).strip()
+    
     async def process_transcript(self, transcript: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Process a voice transcript through the workflow"""
         try:
@@ -291,13 +437,14 @@ class VoxtralWorkflow:
                 "transcript": transcript,
                 "context": context or {},
                 "messages": [],
-                "tools_used": [],
-                "response": "",
+                "openai_messages": [],
                 "should_type": True
             }
             
             # Run the workflow
-            final_state = await self.graph.ainvoke(initial_state)
+            final_state = await self.graph.ainvoke(
+                initial_state, config={"configurable": {"workflow": self}}
+            )
             
             return {
                 "response": final_state.get("response", ""),
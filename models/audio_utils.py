@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+Audio sample helpers shared by the voice pipeline and model handlers
+"""
+
+import numpy as np
+
+def to_pcm16(audio: np.ndarray) -> np.ndarray:
+    """Convert float samples in [-1, 1] to a new int16 PCM array
+    
+    Samples are rounded to the nearest step, then clipped. int16 input is
+    returned unchanged.
+    """
+    if audio.dtype == np.int16:
+        return audio
+    scaled = np.multiply(audio, 32767.0, dtype=np.float32)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return scaled.astype(np.int16)
@@ -8,12 +8,20 @@ Supports word-level timestamps, real-time processing, multilingual, and more
 import os
 import sys
 import time
-import tempfile
 import threading
+import asyncio
 import logging
+import functools
+import dataclasses
+import multiprocessing
+import queue
+import string
+from bisect import bisect_right
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Union, Callable
+from typing import Dict, List, Optional, Any, Union, Callable, Literal, Tuple
 from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
 import numpy as np
 
@@ -29,6 +37,13 @@ except ImportError:
     print("⚠️ OpenAI Whisper not available. Install with: pip install openai-whisper")
     WHISPER_AVAILABLE = False
 
+try:
+    from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    print("⚠️ faster-whisper not available. Install with: pip install faster-whisper")
+    FASTER_WHISPER_AVAILABLE = False
+
 try:
     import whisperx
     WHISPERX_AVAILABLE = True
@@ -36,6 +51,13 @@ except ImportError:
     print("⚠️ WhisperX not available. Install with: pip install git+https://github.com/m-bain/whisperx.git")
     WHISPERX_AVAILABLE = False
 
+try:
+    import webrtcvad
+    VAD_AVAILABLE = True
+except ImportError:
+    print("⚠️ webrtcvad not available. Install with: pip install webrtcvad")
+    VAD_AVAILABLE = False
+
 try:
     import soundfile as sf
     import sounddevice as sd
@@ -46,6 +68,47 @@ except ImportError:
 
 from config.settings import config
 
+def _resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Linearly resample mono float32 audio"""
+    target_len = int(round(audio.size * target_sr / orig_sr))
+    positions = np.arange(target_len, dtype=np.float64) * (orig_sr / target_sr)
+    return np.interp(positions, np.arange(audio.size), audio).astype(np.float32)
+
+@functools.lru_cache(maxsize=1)
+def _get_supported_languages() -> Dict[str, str]:
+    """Get supported languages"""
+    if not WHISPER_AVAILABLE:
+        return {}
+    
+    try:
+        return whisper.tokenizer.LANGUAGES
+    except:
+        # Fallback list of common languages
+        return {
+            "en": "english",
+            "ar": "arabic",
+            "es": "spanish",
+            "fr": "french",
+            "de": "german",
+            "it": "italian",
+            "pt": "portuguese",
+            "ru": "russian",
+            "ja": "japanese",
+            "ko": "korean",
+            "zh": "chinese"
+        }
+
+# int16 PCM -> float32 [-1, 1)
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+# openai-whisper segment dict -> SegmentTable row, in TranscriptionSegment field order
+_SEGMENT_ROW = itemgetter("id", "start", "end", "text", "tokens", "temperature",
+                          "avg_logprob", "compression_ratio", "no_speech_prob")
+
+def _normalize_word(word: str) -> str:
+    """Lowercase a word and strip surrounding punctuation for comparison"""
+    return word.strip().strip(string.punctuation).lower()
+
 class ModelSize(Enum):
     """Whisper model sizes"""
     TINY = "tiny"
@@ -61,7 +124,7 @@ class TaskType(Enum):
     TRANSCRIBE = "transcribe"
     TRANSLATE = "translate"
 
-@dataclass
+@dataclass(slots=True)
 class TranscriptionSegment:
     """A segment of transcribed text with timing"""
     id: int
@@ -82,21 +145,89 @@ class WordTimestamp:
     end: float
     confidence: float = 0.0
 
+@dataclass
+class SegmentTable:
+    """Segments stored column-wise; numeric fields are packed NumPy arrays"""
+    ids: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    temperature: np.ndarray
+    avg_logprob: np.ndarray
+    compression_ratio: np.ndarray
+    no_speech_prob: np.ndarray
+    texts: List[str] = field(default_factory=list)
+    tokens: List[np.ndarray] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.texts)
+    
+    @classmethod
+    def empty(cls) -> "SegmentTable":
+        return cls.from_rows([])
+    
+    @classmethod
+    def from_rows(cls, rows: List[tuple]) -> "SegmentTable":
+        """Build from (id, start, end, text, tokens, temperature, avg_logprob,
+        compression_ratio, no_speech_prob) tuples"""
+        n = len(rows)
+        columns = list(zip(*rows)) if n else [()] * 9
+        
+        def f32(col):
+            return np.fromiter(col, dtype=np.float32, count=n)
+        
+        return cls(
+            ids=np.fromiter(columns[0], dtype=np.int32, count=n),
+            start=f32(columns[1]),
+            end=f32(columns[2]),
+            temperature=f32(columns[5]),
+            avg_logprob=f32(columns[6]),
+            compression_ratio=f32(columns[7]),
+            no_speech_prob=f32(columns[8]),
+            texts=list(columns[3]),
+            tokens=[np.asarray(t, dtype=np.int32) for t in columns[4]]
+        )
+    
+    def to_segments(self) -> List[TranscriptionSegment]:
+        """Materialize TranscriptionSegment objects"""
+        return [
+            TranscriptionSegment(*row)
+            for row in zip(
+                self.ids.tolist(), self.start.tolist(), self.end.tolist(), self.texts,
+                [t.tolist() for t in self.tokens], self.temperature.tolist(),
+                self.avg_logprob.tolist(), self.compression_ratio.tolist(),
+                self.no_speech_prob.tolist()
+            )
+        ]
+
 @dataclass
 class TranscriptionResult:
     """Complete transcription result with all metadata"""
     text: str
     language: str
-    segments: List[TranscriptionSegment] = field(default_factory=list)
+    segment_table: SegmentTable = field(default_factory=SegmentTable.empty)
     word_timestamps: List[WordTimestamp] = field(default_factory=list)
     processing_time: float = 0.0
     model_used: str = ""
     confidence_score: float = 0.0
+    _segments: Optional[List[TranscriptionSegment]] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def segments(self) -> List[TranscriptionSegment]:
+        """Segments as objects, built from the table on first access"""
+        if self._segments is None:
+            self._segments = self.segment_table.to_segments()
+        return self._segments
 
 @dataclass
 class WhisperConfig:
     """Configuration for Whisper engine"""
     model_size: ModelSize = ModelSize.BASE
+    backend: Literal["openai", "faster"] = "openai"  # "faster" = CTranslate2 via faster-whisper (opt-in)
+    compute_type: str = "default"  # CTranslate2: "int8", "int8_float16", "float16", "float32"; "default" follows fp16
+    batch_size: int = 16  # Windows decoded together by transcribe_file (faster backend)
+    cpu_threads: int = 0  # CTranslate2 intra-op threads on CPU (0 = library default)
+    cpu_offload: bool = False  # Run realtime rounds on a CPU int8 model while the GPU is busy
+    compile_encoder: bool = False  # torch.compile the encoder on CUDA (openai backend)
     language: Optional[str] = None  # Auto-detect if None
     task: TaskType = TaskType.TRANSCRIBE
     temperature: float = 0.0
@@ -125,21 +256,51 @@ class EnhancedWhisperEngine:
         
         # Models
         self.whisper_model = None
-        self.whisperx_model = None
+        self.batched = None
+        self.cpu_model = None
         self.alignment_model = None
         self.alignment_metadata = None
         
         # State
         self.is_loaded = False
+        self.backend = self.config.backend
         self.device = self._detect_device()
-        self.supported_languages = self._get_supported_languages()
+        self._gpu_inflight = 0
+        self._mel_window = None
+        self._mel_filters = None
+        self._last_audio: Optional[Tuple[str, Optional[int], np.ndarray]] = None
+        self._gpu_lock = threading.Lock()
+        self.supported_languages = _get_supported_languages()
+        self._options_cache: Dict[Tuple[str, bool], Dict[str, Any]] = {}
         
         # Real-time processing
         self.is_realtime_active = False
         self.realtime_callback = None
-        self.audio_buffer = []
+        self._callback_loop: Optional[asyncio.AbstractEventLoop] = None
         self.sample_rate = 16000
         
+        # Capture ring buffer covering Whisper's 30 s window, written by the
+        # PortAudio callback. Indices are running sample counts: audio before
+        # _tail is committed, _ring_read is how far the worker has looked and
+        # _head is how far capture has written
+        self._ring = np.zeros(int(self.sample_rate * 30.0), dtype=np.float32)
+        self._head = 0
+        self._tail = 0
+        self._ring_read = 0
+        self._chunk_samples = 0
+        self._ring_ready = threading.Event()
+        
+        # Speech gating for realtime chunks (30 ms frames, 250 ms minimum speech)
+        self._vad = webrtcvad.Vad(3) if VAD_AVAILABLE else None
+        self._vad_frame = int(self.sample_rate * 0.03)
+        self._min_speech_samples = int(self.sample_rate * 0.25)
+        
+        # LocalAgreement-2 state: the previous round's uncommitted words
+        self._prev_hypothesis: List[WordTimestamp] = []
+        self._committed: List[str] = []
+        self._max_active_samples = 0
+        self._realtime_language = "unknown"
+        
         self.logger.info(f"Enhanced Whisper Engine initialized with device: {self.device}")
     
     def _detect_device(self) -> str:
@@ -152,55 +313,75 @@ class EnhancedWhisperEngine:
             pass
         return "cpu"
     
-    def _get_supported_languages(self) -> Dict[str, str]:
-        """Get supported languages"""
-        if not WHISPER_AVAILABLE:
-            return {}
+    def _pick_compute_type(self) -> str:
+        """Pick the CTranslate2 compute type for the current device"""
+        if self.config.compute_type != "default":
+            return self.config.compute_type
         
-        try:
-            return whisper.tokenizer.LANGUAGES
-        except:
-            # Fallback list of common languages
-            return {
-                "en": "english",
-                "ar": "arabic",
-                "es": "spanish",
-                "fr": "french",
-                "de": "german",
-                "it": "italian",
-                "pt": "portuguese",
-                "ru": "russian",
-                "ja": "japanese",
-                "ko": "korean",
-                "zh": "chinese"
-            }
+        # INT8 halves weight bandwidth on CPU, but on GPU it can be slower
+        # than FP16 for the smaller models, so only quantize on CPU. On GPU the
+        # existing fp16 setting picks the precision, as it does for openai-whisper
+        if self.device == "cuda":
+            return "float16" if self.config.fp16 else "float32"
+        return "int8"
     
     def load_model(self, force_reload: bool = False) -> bool:
         """Load the Whisper model with current configuration"""
         if self.is_loaded and not force_reload:
             return True
         
-        if not WHISPER_AVAILABLE:
+        self.backend = self.config.backend
+        if self.backend == "faster" and not FASTER_WHISPER_AVAILABLE:
+            self.logger.warning("faster-whisper not available, falling back to openai-whisper")
+            self.backend = "openai"
+        
+        if self.backend == "openai" and not WHISPER_AVAILABLE:
             self.logger.error("Whisper not available")
             return False
         
         try:
-            self.logger.info(f"Loading Whisper model: {self.config.model_size.value}")
+            self.logger.info(f"Loading Whisper model: {self.config.model_size.value} ({self.backend})")
             start_time = time.time()
             
-            # Load main Whisper model
-            self.whisper_model = whisper.load_model(
-                self.config.model_size.value,
-                device=self.device
-            )
+            # Alignment models are per language and only used by the openai backend
+            self.alignment_model = None
+            self.alignment_metadata = None
+            self.batched = None
+            self.cpu_model = None
+            self._mel_window = None
+            self._mel_filters = None
             
-            # Load WhisperX model if available and word timestamps requested
-            if WHISPERX_AVAILABLE and self.config.word_timestamps:
-                self.logger.info("Loading WhisperX for word-level timestamps")
-                self.whisperx_model = whisperx.load_model(
+            if self.backend == "faster":
+                # CTranslate2 model; word timestamps come from the same decode pass
+                self.whisper_model = WhisperModel(
+                    self.config.model_size.value,
+                    device=self.device,
+                    compute_type=self._pick_compute_type(),
+                    cpu_threads=self.config.cpu_threads
+                )
+                # VAD-chunked batched decoding for whole files
+                self.batched = BatchedInferencePipeline(model=self.whisper_model)
+                
+                if self.config.cpu_offload and self.device == "cuda":
+                    self.cpu_model = WhisperModel(
+                        self.config.model_size.value,
+                        device="cpu",
+                        compute_type="int8"
+                    )
+            else:
+                # Load main Whisper model
+                self.whisper_model = whisper.load_model(
                     self.config.model_size.value,
                     device=self.device
                 )
+                
+                # openai-whisper>=20240927 already routes attention through torch's
+                # fused scaled_dot_product_attention by default; only report when it can't
+                if not getattr(whisper.model, "SDPA_AVAILABLE", False):
+                    self.logger.warning("Fused attention unavailable; needs openai-whisper>=20240927 and torch>=2.0")
+                
+                if self.config.compile_encoder and self.device == "cuda":
+                    self._compile_encoder()
             
             load_time = time.time() - start_time
             self.is_loaded = True
@@ -218,68 +399,219 @@ class EnhancedWhisperEngine:
             if not self.load_model():
                 raise RuntimeError("Failed to load Whisper model")
         
+        self.logger.info(f"Transcribing file: {audio_path}")
+        return self._transcribe_array(self._load_audio(audio_path), batched=True)
+    
+    def transcribe_files(self, paths: List[str], max_workers: Optional[int] = None) -> List[TranscriptionResult]:
+        """Transcribe several files: worker processes on CPU, duration buckets on GPU"""
+        # Workers load their own models, so this process doesn't need one
+        use_pool = self.config.backend == "faster" and FASTER_WHISPER_AVAILABLE and self.device == "cpu"
+        
+        # Several workers per NUMA node by default, each pinned to a slice of
+        # that node's CPUs; a single worker would gain nothing over this process
+        workers = min(max_workers or _default_worker_count(), len(paths)) if use_pool else 1
+        if workers < 2:
+            if not self.is_loaded:
+                if not self.load_model():
+                    raise RuntimeError("Failed to load Whisper model")
+            if self.backend == "faster" and len(paths) > 1:
+                return self._transcribe_bucketed(paths)
+            return [self.transcribe_file(path) for path in paths]
+        
+        cpu_sets = _worker_cpu_sets(workers)
+        
+        # Longest files first so a long straggler doesn't start last
+        order = sorted(range(len(paths)), key=lambda i: _audio_duration(paths[i]), reverse=True)
+        
+        ctx = multiprocessing.get_context("spawn")
+        cpu_queue = ctx.Queue()
+        for cpus in cpu_sets:
+            cpu_queue.put(cpus)
+        
+        self.logger.info(f"Transcribing {len(paths)} files with {workers} workers")
+        results: List[Optional[TranscriptionResult]] = [None] * len(paths)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_worker_init,
+                                 initargs=(cpu_queue, self.config)) as executor:
+            ordered = executor.map(_worker_transcribe, [paths[i] for i in order], chunksize=1)
+            for i, result in zip(order, ordered):
+                results[i] = result
+        
+        return results
+    
+    def _bucket_by_duration(self, durations: List[float], batch_size: int,
+                            max_ratio: float = 1.25) -> List[List[int]]:
+        """Group indices of similar duration, at most batch_size per group"""
+        order = sorted(range(len(durations)), key=durations.__getitem__)
+        buckets: List[List[int]] = []
+        current: List[int] = []
+        for i in order:
+            # Sorted ascending, so the first entry is the shortest in the bucket
+            if current and (len(current) >= batch_size
+                            or durations[i] > max_ratio * durations[current[0]]):
+                buckets.append(current)
+                current = []
+            current.append(i)
+        if current:
+            buckets.append(current)
+        return buckets
+    
+    def _transcribe_bucketed(self, paths: List[str]) -> List[TranscriptionResult]:
+        """Decode short files in batches of similar length to limit padding"""
+        durations = [_audio_duration(path) for path in paths]
+        results: List[Optional[TranscriptionResult]] = [None] * len(paths)
+        
+        # Files over one 30 s window (or of unknown length) are batched internally
+        short = [i for i, d in enumerate(durations) if 0.0 < d <= 30.0]
+        for i, duration in enumerate(durations):
+            if not 0.0 < duration <= 30.0:
+                results[i] = self.transcribe_file(paths[i])
+        
+        buckets = self._bucket_by_duration([durations[i] for i in short], self.config.batch_size)
+        for bucket in buckets:
+            indices = [short[j] for j in bucket]
+            for i, result in zip(indices, self._transcribe_bucket([paths[i] for i in indices])):
+                results[i] = result
+        
+        return results
+    
+    def _transcribe_bucket(self, paths: List[str]) -> List[TranscriptionResult]:
+        """Transcribe short files as one batch, one clip per file"""
         start_time = time.time()
+        audios = [self._load_audio(path) for path in paths]
+        # The pipeline slices clip_timestamps in samples; segments come back in seconds
+        offsets = np.concatenate(([0], np.cumsum([audio.size for audio in audios])))
+        bounds = offsets / self.sample_rate
+        clips = [{"start": int(offsets[i]), "end": int(offsets[i + 1])} for i in range(len(paths))]
         
+        # Clips replace VAD chunking, so vad_filter would be ignored anyway.
+        # Without a configured language it is detected once for the whole
+        # bucket, and every file in it reports that language
+        options = {**self._transcribe_options(self.config.word_timestamps), "vad_filter": False}
+        with self._gpu_lock:
+            self._gpu_inflight += 1
         try:
-            self.logger.info(f"Transcribing file: {audio_path}")
+            segments_iter, info = self.batched.transcribe(
+                np.concatenate(audios), batch_size=len(paths), clip_timestamps=clips, **options
+            )
             
-            # Prepare transcription options
-            options = {
-                "language": self.config.language,
-                "task": self.config.task.value,
-                "temperature": self.config.temperature,
-                "best_of": self.config.best_of,
-                "beam_size": self.config.beam_size,
-                "patience": self.config.patience,
-                "length_penalty": self.config.length_penalty,
-                "suppress_tokens": self.config.suppress_tokens,
-                "initial_prompt": self.config.initial_prompt,
-                "condition_on_previous_text": self.config.condition_on_previous_text,
-                "fp16": self.config.fp16,
-                "compression_ratio_threshold": self.config.compression_ratio_threshold,
-                "logprob_threshold": self.config.logprob_threshold,
-                "no_speech_threshold": self.config.no_speech_threshold,
-                "verbose": self.config.verbose,
-                "prepend_punctuations": self.config.prepend_punctuations,
-                "append_punctuations": self.config.append_punctuations
-            }
+            # Segments come back on the joined timeline; split them per file
+            per_file: List[list] = [[] for _ in paths]
+            for seg in segments_iter:
+                per_file[max(0, bisect_right(bounds, seg.start) - 1)].append(seg)
+        finally:
+            with self._gpu_lock:
+                self._gpu_inflight -= 1
+        
+        processing_time = time.time() - start_time
+        results = []
+        for i, segments in enumerate(per_file):
+            table, words = self._collect_segments(segments, offset=float(bounds[i]))
+            results.append(TranscriptionResult(
+                text="".join(table.texts),
+                language=info.language or "unknown",
+                segment_table=table,
+                word_timestamps=words,
+                processing_time=processing_time,
+                model_used=self.config.model_size.value,
+                confidence_score=self._calculate_confidence(table)
+            ))
+        
+        self.logger.info(f"✅ Transcribed {len(paths)} files in {processing_time:.2f}s")
+        return results
+    
+    def transcribe_audio_data(self, audio_data: np.ndarray, sample_rate: int = 16000) -> TranscriptionResult:
+        """Transcribe audio data directly from numpy array"""
+        audio = np.ascontiguousarray(audio_data, dtype=np.float32)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+        if sample_rate != self.sample_rate:
+            audio = _resample(audio, sample_rate, self.sample_rate)
+        
+        return self._transcribe_array(audio)
+    
+    def _load_audio(self, audio_path: str) -> np.ndarray:
+        """Decode an audio file to 16 kHz mono float32, reusing the last decode"""
+        try:
+            mtime = os.stat(audio_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._last_audio is not None and self._last_audio[:2] == (audio_path, mtime):
+            return self._last_audio[2]
+        
+        audio = self._read_16k(audio_path)
+        if audio is None:
+            if self.backend == "faster":
+                audio = decode_audio(audio_path, sampling_rate=self.sample_rate)
+            else:
+                audio = whisper.load_audio(audio_path, sr=self.sample_rate)
+        
+        self._last_audio = (audio_path, mtime, audio)
+        return audio
+    
+    def _read_16k(self, audio_path: str) -> Optional[np.ndarray]:
+        """Read files already at 16 kHz with libsndfile instead of spawning ffmpeg"""
+        if not AUDIO_AVAILABLE:
+            return None
+        try:
+            if sf.info(audio_path).samplerate != self.sample_rate:
+                return None
+            audio, _ = sf.read(audio_path, dtype="float32")
+        except Exception:
+            return None
+        
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+        return audio
+    
+    def _transcribe_array(self, audio: np.ndarray, word_timestamps: Optional[bool] = None,
+                          batched: bool = False) -> TranscriptionResult:
+        """Transcribe 16 kHz mono float32 audio"""
+        if not self.is_loaded:
+            if not self.load_model():
+                raise RuntimeError("Failed to load Whisper model")
+        
+        if word_timestamps is None:
+            word_timestamps = self.config.word_timestamps
+        start_time = time.time()
+        
+        try:
+            if self.backend == "faster":
+                return self._transcribe_faster(audio, start_time, word_timestamps, batched)
             
-            # Remove None values
-            options = {k: v for k, v in options.items() if v is not None}
+            options = self._transcribe_options(word_timestamps)
+            use_whisperx = self.config.word_timestamps and WHISPERX_AVAILABLE
             
             # Transcribe with Whisper
-            result = self.whisper_model.transcribe(audio_path, **options)
+            result = self.whisper_model.transcribe(audio, **options)
             
             # Convert segments
-            segments = []
-            for seg in result.get("segments", []):
-                segments.append(TranscriptionSegment(
-                    id=seg.get("id", 0),
-                    start=seg.get("start", 0.0),
-                    end=seg.get("end", 0.0),
-                    text=seg.get("text", ""),
-                    tokens=seg.get("tokens", []),
-                    temperature=seg.get("temperature", 0.0),
-                    avg_logprob=seg.get("avg_logprob", 0.0),
-                    compression_ratio=seg.get("compression_ratio", 0.0),
-                    no_speech_prob=seg.get("no_speech_prob", 0.0)
-                ))
+            table = SegmentTable.from_rows([_SEGMENT_ROW(seg) for seg in result.get("segments", ())])
             
             # Get word-level timestamps if requested
-            word_timestamps = []
-            if self.config.word_timestamps and WHISPERX_AVAILABLE and self.whisperx_model:
-                word_timestamps = self._get_word_timestamps(audio_path, result)
+            words = []
+            if use_whisperx:
+                words = self._get_word_timestamps(audio, result)
+            elif word_timestamps:
+                for seg in result.get("segments", []):
+                    for word_info in seg.get("words", []):
+                        words.append(WordTimestamp(
+                            word=word_info.get("word", ""),
+                            start=word_info.get("start", 0.0),
+                            end=word_info.get("end", 0.0),
+                            confidence=word_info.get("probability", 0.0)
+                        ))
             
             processing_time = time.time() - start_time
             
             # Calculate confidence score
-            confidence_score = self._calculate_confidence(segments)
+            confidence_score = self._calculate_confidence(table)
             
             transcription_result = TranscriptionResult(
                 text=result["text"],
                 language=result.get("language", "unknown"),
-                segments=segments,
-                word_timestamps=word_timestamps,
+                segment_table=table,
+                word_timestamps=words,
                 processing_time=processing_time,
                 model_used=self.config.model_size.value,
                 confidence_score=confidence_score
@@ -292,32 +624,165 @@ class EnhancedWhisperEngine:
             self.logger.error(f"Transcription failed: {e}")
             raise
     
-    def transcribe_audio_data(self, audio_data: np.ndarray, sample_rate: int = 16000) -> TranscriptionResult:
-        """Transcribe audio data directly from numpy array"""
-        # Save to temporary file and transcribe
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-            sf.write(temp_file.name, audio_data, sample_rate)
-            temp_path = temp_file.name
+    def _compile_encoder(self):
+        """Compile the encoder for its fixed (1, n_mels, 3000) input and warm it up"""
+        import torch
+        
+        # Keep Inductor's compiled kernels across runs
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR",
+                              str(Path.home() / ".cache" / "voxtral" / "inductor"))
         
         try:
-            result = self.transcribe_file(temp_path)
-            return result
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            self.whisper_model.encoder = torch.compile(
+                self.whisper_model.encoder,
+                mode="reduce-overhead",
+                fullgraph=True,
+                dynamic=False
+            )
+            
+            # Pay the compile cost here rather than on the first transcription
+            dtype = torch.float16 if self.config.fp16 else torch.float32
+            dummy = torch.zeros(1, self.whisper_model.dims.n_mels, 3000, device=self.device, dtype=dtype)
+            with torch.inference_mode():
+                self.whisper_model.encoder(dummy)
+        except Exception as e:
+            self.logger.warning(f"Encoder compilation failed, running eagerly: {e}")
+            self.whisper_model.encoder = getattr(self.whisper_model.encoder, "_orig_mod",
+                                                 self.whisper_model.encoder)
     
-    def _get_word_timestamps(self, audio_path: str, whisper_result: Dict) -> List[WordTimestamp]:
+    def _transcribe_options(self, word_timestamps: bool) -> Dict[str, Any]:
+        """Decode options for the active backend, built once per configuration"""
+        key = (self.backend, word_timestamps)
+        options = self._options_cache.get(key)
+        if options is not None:
+            return options
+        
+        if self.backend == "faster":
+            options = {
+                "language": self.config.language,
+                "task": self.config.task.value,
+                "temperature": self.config.temperature,
+                "best_of": self.config.best_of,
+                "beam_size": self.config.beam_size,
+                "patience": self.config.patience,
+                "length_penalty": self.config.length_penalty,
+                "suppress_tokens": [int(t) for t in self.config.suppress_tokens.split(",") if t.strip()],
+                "initial_prompt": self.config.initial_prompt,
+                "condition_on_previous_text": self.config.condition_on_previous_text,
+                "compression_ratio_threshold": self.config.compression_ratio_threshold,
+                "log_prob_threshold": self.config.logprob_threshold,
+                "no_speech_threshold": self.config.no_speech_threshold,
+                "word_timestamps": word_timestamps,
+                "prepend_punctuations": self.config.prepend_punctuations,
+                "append_punctuations": self.config.append_punctuations,
+                "vad_filter": True
+            }
+        else:
+            # WhisperX alignment replaces Whisper's own word timings when configured
+            use_whisperx = self.config.word_timestamps and WHISPERX_AVAILABLE
+            options = {
+                "language": self.config.language,
+                "task": self.config.task.value,
+                "temperature": self.config.temperature,
+                "best_of": self.config.best_of,
+                "beam_size": self.config.beam_size,
+                "patience": self.config.patience,
+                "length_penalty": self.config.length_penalty,
+                "suppress_tokens": self.config.suppress_tokens,
+                "initial_prompt": self.config.initial_prompt,
+                "condition_on_previous_text": self.config.condition_on_previous_text,
+                "fp16": self.config.fp16,
+                "compression_ratio_threshold": self.config.compression_ratio_threshold,
+                "logprob_threshold": self.config.logprob_threshold,
+                "no_speech_threshold": self.config.no_speech_threshold,
+                "verbose": self.config.verbose,
+                "word_timestamps": word_timestamps and not use_whisperx,
+                "prepend_punctuations": self.config.prepend_punctuations,
+                "append_punctuations": self.config.append_punctuations
+            }
+        
+        # Remove None values
+        options = {k: v for k, v in options.items() if v is not None}
+        self._options_cache[key] = options
+        return options
+    
+    def _transcribe_faster(self, audio: np.ndarray, start_time: float,
+                           word_timestamps: bool, batched: bool = False) -> TranscriptionResult:
+        """Transcribe with the faster-whisper backend"""
+        options = self._transcribe_options(word_timestamps)
+        
+        if not batched and self._should_offload():
+            segments_iter, info = self.cpu_model.transcribe(audio, **options)
+            table, words = self._collect_segments(segments_iter)
+        else:
+            with self._gpu_lock:
+                self._gpu_inflight += 1
+            try:
+                if batched:
+                    # Pads VAD chunks to a common length so the encoder runs them as one batch
+                    segments_iter, info = self.batched.transcribe(audio, batch_size=self.config.batch_size, **options)
+                else:
+                    segments_iter, info = self.whisper_model.transcribe(audio, **options)
+                table, words = self._collect_segments(segments_iter)
+            finally:
+                with self._gpu_lock:
+                    self._gpu_inflight -= 1
+        
+        processing_time = time.time() - start_time
+        
+        transcription_result = TranscriptionResult(
+            text="".join(table.texts),
+            language=info.language or "unknown",
+            segment_table=table,
+            word_timestamps=words,
+            processing_time=processing_time,
+            model_used=self.config.model_size.value,
+            confidence_score=self._calculate_confidence(table)
+        )
+        
+        self.logger.info(f"✅ Transcription completed in {processing_time:.2f}s")
+        return transcription_result
+    
+    def _should_offload(self) -> bool:
+        """Send a realtime round to the CPU model if the GPU is busy and the CPU isn't"""
+        if self.cpu_model is None or self._gpu_inflight == 0:
+            return False
+        return os.getloadavg()[0] / (os.cpu_count() or 1) < 0.7
+    
+    def _collect_segments(self, segments_iter,
+                          offset: float = 0.0) -> Tuple[SegmentTable, List[WordTimestamp]]:
+        """Run the lazy faster-whisper segment generator to completion"""
+        rows = []
+        words = []
+        for seg in segments_iter:
+            rows.append((
+                seg.id,
+                seg.start - offset,
+                seg.end - offset,
+                seg.text,
+                seg.tokens,
+                seg.temperature,
+                seg.avg_logprob,
+                seg.compression_ratio,
+                seg.no_speech_prob
+            ))
+            for word in seg.words or ():
+                words.append(WordTimestamp(
+                    word=word.word,
+                    start=word.start - offset,
+                    end=word.end - offset,
+                    confidence=word.probability
+                ))
+        return SegmentTable.from_rows(rows), words
+    
+    def _get_word_timestamps(self, audio: np.ndarray, whisper_result: Dict) -> List[WordTimestamp]:
         """Get word-level timestamps using WhisperX"""
-        if not WHISPERX_AVAILABLE or not self.whisperx_model:
+        if not WHISPERX_AVAILABLE:
             return []
         
         try:
             self.logger.info("Generating word-level timestamps...")
             
-            # Load audio for WhisperX
-            audio = whisperx.load_audio(audio_path)
-            
             # Load alignment model if not already loaded
             if not self.alignment_model:
                 language_code = whisper_result.get("language", "en")
@@ -326,19 +791,26 @@ class EnhancedWhisperEngine:
                     device=self.device
                 )
             
-            # Align the segments
-            result_aligned = whisperx.align(
-                whisper_result["segments"],
-                self.alignment_model,
-                self.alignment_metadata,
-                audio,
-                device=self.device,
-                return_char_alignments=False
-            )
+            # Segments align independently, so longer files are split into
+            # contiguous groups aligned on a thread pool; torch and the NumPy
+            # backtracking release the GIL, keeping the device busy meanwhile
+            segments = whisper_result["segments"]
+            if len(segments) >= 4:
+                workers = max(1, min(os.cpu_count() or 1, len(segments) // 2))
+                size = -(-len(segments) // workers)
+                groups = [segments[i:i + size] for i in range(0, len(segments), size)]
+                with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                    aligned = [
+                        seg
+                        for part in pool.map(self._align_segments, groups, [audio] * len(groups))
+                        for seg in part
+                    ]
+            else:
+                aligned = self._align_segments(segments, audio)
             
             # Extract word timestamps
             word_timestamps = []
-            for segment in result_aligned.get("segments", []):
+            for segment in aligned:
                 for word_info in segment.get("words", []):
                     word_timestamps.append(WordTimestamp(
                         word=word_info.get("word", ""),
@@ -354,23 +826,35 @@ class EnhancedWhisperEngine:
             self.logger.error(f"Word timestamp generation failed: {e}")
             return []
     
-    def _calculate_confidence(self, segments: List[TranscriptionSegment]) -> float:
+    def _align_segments(self, segments: List[Dict], audio: np.ndarray) -> List[Dict]:
+        """Run WhisperX alignment over a run of segments"""
+        result_aligned = whisperx.align(
+            segments,
+            self.alignment_model,
+            self.alignment_metadata,
+            audio,
+            device=self.device,
+            return_char_alignments=False
+        )
+        return result_aligned.get("segments", [])
+    
+    def _calculate_confidence(self, table: SegmentTable) -> float:
         """Calculate overall confidence score from segments"""
-        if not segments:
+        if not len(table):
             return 0.0
         
-        # Use average log probability as confidence indicator
-        total_logprob = sum(seg.avg_logprob for seg in segments)
-        avg_logprob = total_logprob / len(segments)
-        
-        # Convert log probability to confidence (0-1 scale)
-        # This is a heuristic - adjust based on your needs
-        confidence = max(0.0, min(1.0, (avg_logprob + 1.0) / 1.0))
-        return confidence
+        # Use average log probability as confidence indicator, converted to a
+        # 0-1 scale. This is a heuristic - adjust based on your needs
+        return float(np.clip(table.avg_logprob.mean() + 1.0, 0.0, 1.0))
     
     def start_realtime_transcription(self, callback: Callable[[TranscriptionResult], None],
-                                   chunk_duration: float = 3.0) -> bool:
-        """Start real-time transcription with callback"""
+                                   chunk_duration: float = 3.0,
+                                   loop: Optional[asyncio.AbstractEventLoop] = None) -> bool:
+        """Start real-time transcription with callback
+        
+        With an event loop, results are handed to it and the callback runs
+        there, so slow callbacks never hold up decoding of the next chunk.
+        """
         if not AUDIO_AVAILABLE:
             self.logger.error("Audio libraries not available for real-time transcription")
             return False
@@ -385,6 +869,17 @@ class EnhancedWhisperEngine:
         
         self.is_realtime_active = True
         self.realtime_callback = callback
+        self._callback_loop = loop
+        
+        # Leave room for two chunks of capture beyond the uncommitted audio
+        self._chunk_samples = min(int(self.sample_rate * chunk_duration), self._ring.size // 3)
+        self._max_active_samples = self._ring.size - 2 * self._chunk_samples
+        self._head = 0
+        self._tail = 0
+        self._ring_read = 0
+        self._ring_ready.clear()
+        self._prev_hypothesis = []
+        self._committed.clear()
         
         # Start real-time processing thread
         threading.Thread(
@@ -400,38 +895,175 @@ class EnhancedWhisperEngine:
         """Stop real-time transcription"""
         self.is_realtime_active = False
         self.realtime_callback = None
-        self.audio_buffer.clear()
+        self._ring_ready.set()
+        self._reset_agreement()
+        self._committed.clear()
         self.logger.info("Real-time transcription stopped")
     
+    def _audio_cb(self, indata, frames, time_info, status):
+        """PortAudio callback: scale captured int16 samples into the float32 ring"""
+        samples = indata[:, 0]
+        capacity = self._ring.size
+        if frames > capacity:
+            samples = samples[-capacity:]
+            frames = capacity
+        
+        start = self._head % capacity
+        first = min(frames, capacity - start)
+        np.multiply(samples[:first], _INT16_SCALE, out=self._ring[start:start + first])
+        if first < frames:
+            np.multiply(samples[first:], _INT16_SCALE, out=self._ring[:frames - first])
+        self._head += frames
+        
+        if self._head - self._ring_read >= self._chunk_samples:
+            self._ring_ready.set()
+    
+    def _ring_slice(self, start: int, end: int) -> np.ndarray:
+        """Samples [start, end) of the session, copied out of the ring"""
+        capacity = self._ring.size
+        lo = start % capacity
+        hi = lo + (end - start)
+        if hi <= capacity:
+            # The callback keeps writing while the worker decodes, so a view
+            # could be overwritten mid-transcription once capture wraps
+            return self._ring[lo:hi].copy()
+        return np.concatenate((self._ring[lo:], self._ring[:hi - capacity]))
+    
+    def _next_chunk(self) -> Tuple[int, np.ndarray]:
+        """Return the start index and samples captured since the last read"""
+        head = self._head
+        capacity = self._ring.size
+        if head - self._tail > capacity:
+            self.logger.warning("Real-time transcription fell behind, dropping %d samples",
+                                head - capacity - self._tail)
+            self._tail = head - capacity
+            self._ring_read = max(self._ring_read, self._tail)
+        
+        start = self._ring_read
+        self._ring_read = head
+        return start, self._ring_slice(start, head)
+    
+    def _speech_bounds(self, audio: np.ndarray) -> Optional[Tuple[int, int]]:
+        """Return the sample span from first to last speech frame, or None"""
+        frame = self._vad_frame
+        n_frames = audio.size // frame
+        if n_frames == 0:
+            return None
+        
+        pcm = np.clip(audio[:n_frames * frame] * 32767.0, -32768, 32767).astype(np.int16)
+        view = memoryview(pcm.tobytes())
+        frame_bytes = frame * 2
+        speech = [
+            self._vad.is_speech(view[i * frame_bytes:(i + 1) * frame_bytes], self.sample_rate)
+            for i in range(n_frames)
+        ]
+        
+        if sum(speech) * frame < self._min_speech_samples:
+            return None
+        
+        first = speech.index(True)
+        last = n_frames - speech[::-1].index(True)
+        return first * frame, last * frame
+    
+    def _reset_agreement(self):
+        """Drop the uncommitted audio and hypothesis"""
+        self._tail = self._ring_read
+        self._prev_hypothesis = []
+    
+    def _local_agreement(self, hypothesis: List[WordTimestamp]) -> List[WordTimestamp]:
+        """Commit the leading words on which this and the previous round agree"""
+        agreed = 0
+        for new, old in zip(hypothesis, self._prev_hypothesis):
+            if _normalize_word(new.word) != _normalize_word(old.word):
+                break
+            agreed += 1
+        
+        self._prev_hypothesis = hypothesis[agreed:]
+        return hypothesis[:agreed]
+    
+    def _realtime_round(self, audio_data: np.ndarray, chunk_start: int) -> List[WordTimestamp]:
+        """Run one LocalAgreement-2 round and return the newly committed words"""
+        # Skip chunks without speech; a pause finalizes whatever is pending
+        if self._vad is not None:
+            bounds = self._speech_bounds(audio_data)
+        else:
+            rms_energy = np.sqrt(np.mean(audio_data ** 2))
+            bounds = (0, audio_data.size) if rms_energy >= 0.01 else None  # Silence threshold
+        
+        if bounds is None:
+            committed = self._prev_hypothesis
+            self._reset_agreement()
+            return committed
+        
+        # Nothing pending: start the uncommitted audio at the first speech frame
+        if self._tail >= chunk_start:
+            self._tail = chunk_start + bounds[0]
+        
+        # Re-transcribe all uncommitted audio; times become session-relative
+        active_start = self._tail
+        active = self._ring_slice(active_start, self._ring_read)
+        result = self._transcribe_array(active, word_timestamps=True)
+        self._realtime_language = result.language
+        offset = active_start / self.sample_rate
+        hypothesis = [
+            WordTimestamp(w.word, w.start + offset, w.end + offset, w.confidence)
+            for w in result.word_timestamps
+        ]
+        
+        committed = self._local_agreement(hypothesis)
+        if committed:
+            # Advance the tail past the last committed word
+            cut = int(committed[-1].end * self.sample_rate)
+            self._tail = min(max(cut, active_start), self._ring_read)
+        elif active.size >= self._max_active_samples:
+            # No agreement within Whisper's 30 s window; take the hypothesis as is
+            committed = self._prev_hypothesis
+            self._reset_agreement()
+        
+        return committed
+    
     def _realtime_processing_loop(self, chunk_duration: float):
         """Real-time processing loop"""
-        chunk_samples = int(self.sample_rate * chunk_duration)
-        
         try:
+            # The callback never blocks on transcription, so capture keeps
+            # running while a chunk is being decoded
             with sd.InputStream(
                 samplerate=self.sample_rate,
                 channels=1,
-                dtype=np.float32,
-                blocksize=1024
-            ) as stream:
+                dtype=np.int16,
+                blocksize=1024,
+                callback=self._audio_cb
+            ):
                 
                 while self.is_realtime_active:
-                    # Read audio chunk
-                    audio_chunk, _ = stream.read(chunk_samples)
-                    audio_data = audio_chunk.flatten()
-                    
-                    # Check if there's enough audio energy
-                    rms_energy = np.sqrt(np.mean(audio_data ** 2))
-                    if rms_energy < 0.01:  # Silence threshold
+                    if not self._ring_ready.wait(timeout=chunk_duration * 2):
                         continue
+                    self._ring_ready.clear()
+                    if not self.is_realtime_active:
+                        break
+                    
+                    chunk_start, audio_data = self._next_chunk()
                     
                     # Transcribe chunk
                     try:
-                        result = self.transcribe_audio_data(audio_data, self.sample_rate)
+                        committed = self._realtime_round(audio_data, chunk_start)
+                        text = "".join(w.word for w in committed).strip()
                         
-                        # Call callback if text is meaningful
-                        if result.text.strip() and self.realtime_callback:
-                            self.realtime_callback(result)
+                        # Call callback with newly committed text only
+                        callback = self.realtime_callback
+                        if text and callback:
+                            self._committed.append(text)
+                            result = TranscriptionResult(
+                                text=text,
+                                language=self._realtime_language,
+                                word_timestamps=committed,
+                                model_used=self.config.model_size.value,
+                                confidence_score=float(np.mean([w.confidence for w in committed]))
+                            )
+                            if self._callback_loop is not None:
+                                self._callback_loop.call_soon_threadsafe(callback, result)
+                            else:
+                                callback(result)
                             
                     except Exception as e:
                         self.logger.error(f"Real-time chunk processing error: {e}")
@@ -442,19 +1074,49 @@ class EnhancedWhisperEngine:
         finally:
             self.is_realtime_active = False
     
-    def detect_language(self, audio_path: str) -> Dict[str, float]:
-        """Detect language probabilities for audio file"""
+    def _log_mel(self, audio: np.ndarray):
+        """Whisper's log-Mel spectrogram, computed on the model's device"""
+        import torch
+        
+        # Window and filterbank stay resident on the device between calls
+        if self._mel_window is None:
+            device = self.whisper_model.device
+            self._mel_window = torch.hann_window(whisper.audio.N_FFT, device=device)
+            self._mel_filters = whisper.audio.mel_filters(device, self.whisper_model.dims.n_mels)
+        
+        with torch.inference_mode():
+            x = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32)).to(self._mel_window.device)
+            stft = torch.stft(x, whisper.audio.N_FFT, whisper.audio.HOP_LENGTH,
+                              window=self._mel_window, return_complex=True)
+            power = stft[..., :-1].abs().pow_(2)
+            log_spec = (self._mel_filters @ power).clamp_(min=1e-10).log10_()
+            log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+            return (log_spec + 4.0) / 4.0
+    
+    def detect_language(self, audio: Union[str, np.ndarray]) -> Dict[str, float]:
+        """Detect language probabilities for an audio file or 16 kHz array"""
         if not self.is_loaded:
             if not self.load_model():
                 raise RuntimeError("Failed to load Whisper model")
         
         try:
-            # Load audio
-            audio = whisper.load_audio(audio_path)
+            # Decodes at most once; a file just transcribed is already cached
+            if isinstance(audio, str):
+                audio = self._load_audio(audio)
+            
+            if self.backend == "faster":
+                # Only language detection runs until the segment generator is consumed
+                _, info = self.whisper_model.transcribe(audio, language=None)
+                language_probs = {}
+                for lang_code, prob in info.all_language_probs or ():
+                    lang_name = self.supported_languages.get(lang_code, lang_code)
+                    language_probs[f"{lang_name} ({lang_code})"] = float(prob)
+                return dict(sorted(language_probs.items(), key=lambda x: x[1], reverse=True))
+            
             audio = whisper.pad_or_trim(audio)
             
             # Make log-Mel spectrogram
-            mel = whisper.log_mel_spectrogram(audio).to(self.whisper_model.device)
+            mel = self._log_mel(audio)
             
             # Detect language
             _, probs = self.whisper_model.detect_language(mel)
@@ -478,10 +1140,14 @@ class EnhancedWhisperEngine:
         """Get information about the loaded model"""
         return {
             "model_size": self.config.model_size.value,
+            "backend": self.backend,
             "device": self.device,
+            "compute_type": self._pick_compute_type() if self.backend == "faster" else None,
             "is_loaded": self.is_loaded,
             "whisper_available": WHISPER_AVAILABLE,
+            "faster_whisper_available": FASTER_WHISPER_AVAILABLE,
             "whisperx_available": WHISPERX_AVAILABLE,
+            "sdpa_available": WHISPER_AVAILABLE and getattr(whisper.model, "SDPA_AVAILABLE", False),
             "word_timestamps_enabled": self.config.word_timestamps,
             "supported_languages": len(self.supported_languages),
             "realtime_active": self.is_realtime_active
@@ -490,6 +1156,7 @@ class EnhancedWhisperEngine:
     def update_config(self, **kwargs) -> bool:
         """Update configuration and reload model if necessary"""
         reload_needed = False
+        self._options_cache.clear()
         
         for key, value in kwargs.items():
             if hasattr(self.config, key):
@@ -497,7 +1164,7 @@ class EnhancedWhisperEngine:
                 setattr(self.config, key, value)
                 
                 # Check if model reload is needed
-                if key in ["model_size", "word_timestamps"] and old_value != value:
+                if key in ["model_size", "backend", "compute_type", "cpu_offload", "compile_encoder", "word_timestamps"] and old_value != value:
                     reload_needed = True
         
         if reload_needed and self.is_loaded:
@@ -512,31 +1179,27 @@ class EnhancedWhisperEngine:
             if not self.load_model():
                 raise RuntimeError("Failed to load Whisper model")
         
-        # Create test audio if not provided
-        if not test_audio_path:
-            # Generate 10 seconds of test audio
-            duration = 10
-            sample_rate = 16000
-            t = np.linspace(0, duration, duration * sample_rate)
-            test_audio = 0.1 * np.sin(2 * np.pi * 440 * t)  # 440 Hz tone
-            
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                sf.write(temp_file.name, test_audio, sample_rate)
-                test_audio_path = temp_file.name
-            
-            cleanup_test_file = True
-        else:
-            cleanup_test_file = False
-        
         try:
             # Benchmark transcription
-            start_time = time.time()
-            result = self.transcribe_file(test_audio_path)
-            transcription_time = time.time() - start_time
-            
-            # Get audio duration
-            audio_info = sf.info(test_audio_path)
-            audio_duration = audio_info.duration
+            if test_audio_path:
+                start_time = time.time()
+                result = self.transcribe_file(test_audio_path)
+                transcription_time = time.time() - start_time
+                
+                # Already decoded by transcribe_file
+                audio_duration = self._load_audio(test_audio_path).size / self.sample_rate
+            else:
+                # Generate 10 seconds of test audio (440 Hz tone) in memory
+                duration = 10
+                sample_rate = 16000
+                t = np.arange(duration * sample_rate, dtype=np.float32) / sample_rate
+                test_audio = (0.1 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+                
+                start_time = time.time()
+                result = self.transcribe_audio_data(test_audio, sample_rate)
+                transcription_time = time.time() - start_time
+                
+                audio_duration = test_audio.size / sample_rate
             
             # Calculate metrics
             real_time_factor = transcription_time / audio_duration
@@ -547,15 +1210,89 @@ class EnhancedWhisperEngine:
                 "real_time_factor": real_time_factor,
                 "characters_per_second": len(result.text) / transcription_time if transcription_time > 0 else 0,
                 "confidence_score": result.confidence_score,
-                "segments_count": len(result.segments),
+                "segments_count": len(result.segment_table),
                 "word_timestamps_count": len(result.word_timestamps)
             }
             
             return benchmark_results
             
-        finally:
-            if cleanup_test_file and os.path.exists(test_audio_path):
-                os.unlink(test_audio_path)
+        except Exception as e:
+            self.logger.error(f"Benchmark failed: {e}")
+            raise
+
+def _parse_cpulist(text: str) -> List[int]:
+    """Parse a sysfs cpulist such as 0-7,16-23"""
+    cpus = []
+    for part in text.strip().split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+def _numa_cpu_sets() -> List[List[int]]:
+    """Usable CPUs grouped by NUMA node (one group if topology is unknown)"""
+    allowed = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else set(range(os.cpu_count() or 1))
+    nodes = []
+    for cpulist in sorted(Path("/sys/devices/system/node").glob("node[0-9]*/cpulist")):
+        try:
+            cpus = [cpu for cpu in _parse_cpulist(cpulist.read_text()) if cpu in allowed]
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [sorted(allowed)]
+
+def _default_worker_count() -> int:
+    """Workers per NUMA node sized so each gets about _WORKER_CPU_THREADS CPUs"""
+    return sum(max(1, len(node) // _WORKER_CPU_THREADS) for node in _numa_cpu_sets())
+
+def _worker_cpu_sets(workers: int) -> List[List[int]]:
+    """Split NUMA nodes round-robin into one CPU set per worker"""
+    nodes = _numa_cpu_sets()
+    cpu_sets = []
+    for i in range(max(1, workers)):
+        node = nodes[i % len(nodes)]
+        sharing = len(range(i % len(nodes), workers, len(nodes)))
+        size = max(1, len(node) // sharing)
+        k = i // len(nodes)
+        cpu_sets.append(node[k * size:(k + 1) * size] or node)
+    return cpu_sets
+
+def _audio_duration(path: str) -> float:
+    """Audio duration in seconds, or 0.0 if it can't be read cheaply"""
+    if not AUDIO_AVAILABLE:
+        return 0.0
+    try:
+        return sf.info(path).duration
+    except Exception:
+        return 0.0
+
+# CTranslate2 scales sublinearly past a few intra-op threads per file, so
+# transcribe_files prefers more workers with fewer threads each
+_WORKER_CPU_THREADS = 4
+
+# Per-process engine for transcribe_files workers
+_worker_engine: Optional["EnhancedWhisperEngine"] = None
+
+def _worker_init(cpu_queue, whisper_config: WhisperConfig):
+    """Pin this worker to its CPU set and load a model sized to it"""
+    global _worker_engine
+    
+    try:
+        cpus = cpu_queue.get_nowait()
+    except queue.Empty:
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    
+    worker_config = dataclasses.replace(whisper_config, cpu_threads=len(cpus), cpu_offload=False)
+    _worker_engine = EnhancedWhisperEngine(worker_config)
+    _worker_engine.load_model()
+
+def _worker_transcribe(path: str) -> TranscriptionResult:
+    return _worker_engine.transcribe_file(path)
 
 # Global instance
 enhanced_whisper_engine = None
@@ -575,6 +1312,12 @@ def create_whisper_config_from_settings() -> WhisperConfig:
     
     return WhisperConfig(
         model_size=ModelSize(whisper_settings.get("model_size", "base")),
+        backend=whisper_settings.get("backend", "openai"),
+        compute_type=whisper_settings.get("compute_type", "default"),
+        batch_size=whisper_settings.get("batch_size", 16),
+        cpu_threads=whisper_settings.get("cpu_threads", 0),
+        cpu_offload=whisper_settings.get("cpu_offload", False),
+        compile_encoder=whisper_settings.get("compile_encoder", False),
         language=whisper_settings.get("language"),
         task=TaskType(whisper_settings.get("task", "transcribe")),
         temperature=whisper_settings.get("temperature", 0.0),
@@ -10,16 +10,36 @@ import logging
 import json
 import aiohttp
 import numpy as np
+import struct
 import subprocess
 import os
-from typing import List, Dict, Any, Optional, Union
-from pathlib import Path
-import tempfile
-import soundfile as sf
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Union, AsyncIterator, Callable
 from config.settings import config
+from models.audio_utils import to_pcm16
 
 logger = logging.getLogger(__name__)
 
+# Prefer orjson for request bodies and stream chunks; it serializes straight to
+# bytes and parses bytes without decoding. orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so the except clauses below cover both.
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+    
+    _loads = orjson.loads
+    # Pre-serialized JSON spliced into a larger document (orjson >= 3.10)
+    _Fragment = getattr(orjson, "Fragment", None)
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    
+    _loads = json.loads
+    _Fragment = None
+
 # Try to import OpenAI Whisper as fallback
 try:
     import whisper
@@ -29,32 +49,159 @@ except ImportError:
     WHISPER_AVAILABLE = False
     logger.warning("OpenAI Whisper not available - transcription will rely on VLLM only")
 
+# A successful connectivity probe is trusted for this many seconds
+PROBE_TTL = 60.0
+
+# Upper bound on cached read-only tool results
+TOOL_CACHE_MAX = 256
+
+# Static system prompt, kept byte-identical across requests so a VLLM server
+# started with --enable-prefix-caching can skip re-prefilling it
+SYSTEM_PROMPT = """You are Voxtral, a voice-controlled AI assistant running on Linux (Debian 12 GNOME Wayland).
+
+You help users with:
+- Voice-to-text transcription and typing
+- Shell commands and system operations
+- Web searches and information lookup
+- File operations and text editing
+- General productivity tasks
+
+You are cursor-aware and can type text directly where the user's cursor is positioned.
+Be concise and helpful. When using tools, explain what you're doing briefly."""
+
+def _wav_header(n_samples: int, sample_rate: int) -> bytes:
+    """44-byte RIFF header for mono 16-bit PCM"""
+    data_size = n_samples * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_size
+    )
+
+async def _iter_sse_data(response) -> AsyncIterator[bytes]:
+    """Yield the raw data payload of each SSE event until [DONE]
+    
+    Works on bytes throughout: events are framed on blank lines as chunks
+    arrive, so nothing is decoded or stripped per token.
+    """
+    buf = bytearray()
+    async for chunk in response.content.iter_any():
+        buf += chunk
+        start = 0
+        while True:
+            end = buf.find(b"\n\n", start)
+            if end < 0:
+                break
+            event = bytes(buf[start:end])
+            start = end + 2
+            if event.startswith(b"data: "):
+                data = event[6:]
+                if data == b"[DONE]":
+                    return
+                yield data
+        if start:
+            del buf[:start]
+    
+    # A final event without a trailing blank line
+    if buf.startswith(b"data: ") and buf[6:].strip() != b"[DONE]":
+        yield bytes(buf[6:])
+
 class VLLMHandler:
     """Handles VLLM model operations via OpenAI-compatible API with audio transcription and tool support"""
     
     def __init__(self):
         self.endpoint = config.get("vllm_endpoint", "http://localhost:8000/v1")
         self.model_name = config.get("model_name", "mistralai/Voxtral-Mini-3B-2507")
+        # Endpoint URLs are built once rather than formatted on every call
+        self._models_url = f"{self.endpoint}/models"
+        self._transcriptions_url = f"{self.endpoint}/audio/transcriptions"
+        self._chat_url = f"{self.endpoint}/chat/completions"
         self.tools_registry = {}
+        # Tool functions split by kind at registration, so calls need no inspection
+        self._async_tools: Dict[str, Callable[..., Any]] = {}
+        self._sync_tools: Dict[str, Callable[..., Any]] = {}
+        # Built on first use and dropped whenever a tool is registered
+        self._tools_schema_cache: Optional[List[Dict[str, Any]]] = None
+        self._tools_schema_bytes: Optional[bytes] = None
         self.session = None
+        self._load_model_settings()
+        # Connectivity is probed in the background rather than blocking startup
+        self._probe_task: Optional[asyncio.Task] = None
+        self._last_probe_ok_at = 0.0
+        # Read-only tools (cache_ttl > 0) share one in-flight execution between
+        # identical calls and keep results for their TTL; other tools always run
+        self._inflight_tools: Dict[tuple, asyncio.Future] = {}
+        self._tool_result_cache: Dict[tuple, tuple] = {}
+        # VLLM transcription is HTTP-async; only the local Whisper fallback blocks,
+        # so it runs on a small dedicated pool instead of the event loop
+        self._stt_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stt")
+        # Fallback Whisper model, loaded once on first use
+        self._whisper_model = None
+        self._whisper_lock = asyncio.Lock()
+        
+    def _load_model_settings(self):
+        """Snapshot the model sampling settings so requests read plain attributes
         
+        config has no change notifications; this is re-run on initialize().
+        """
+        model = config.get("model", {})
+        self._temp_chat = float(model.get("temperature_chat", 0.2))
+        self._top_p = float(model.get("top_p", 0.95))
+        self._max_tokens = int(model.get("max_tokens", 2048))
+        self._enable_tools = bool(model.get("enable_tool_use", True))
+        self._temp_transcription = str(model.get("temperature_transcription", 0.0))
+    
     async def initialize(self):
         """Initialize the HTTP session for API calls"""
+        self._load_model_settings()
         try:
-            self.session = aiohttp.ClientSession()
-            
-            # Test connection
-            await self._test_connection()
-            logger.info(f"VLLM API connection established: {self.endpoint}")
+            # One pooled keep-alive connector shared by chat and transcription
+            # requests, so calls reuse open connections instead of reconnecting
+            connector = aiohttp.TCPConnector(
+                limit=256, limit_per_host=64, keepalive_timeout=30,
+                ttl_dns_cache=300, enable_cleanup_closed=True
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=60)
+            )
             
         except Exception as e:
             logger.error(f"Failed to initialize VLLM API connection: {e}")
             raise
+        
+        # Test connection without delaying the first request
+        self._schedule_probe()
+    
+    def _schedule_probe(self):
+        """Start a background connectivity probe unless a recent one succeeded"""
+        if self.session is None:
+            return
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        if time.monotonic() - self._last_probe_ok_at < PROBE_TTL:
+            return
+        self._probe_task = asyncio.create_task(self._probe_connection())
+    
+    async def _probe_connection(self):
+        """Run _test_connection and record the outcome instead of raising"""
+        try:
+            await self._test_connection()
+        except Exception as e:
+            logger.error(f"VLLM connectivity check failed: {e}")
+            return
+        self._last_probe_ok_at = time.monotonic()
+        logger.info(f"VLLM API connection established: {self.endpoint}")
+    
+    def _connection_failed(self):
+        """Forget the last good probe after a request error and re-check"""
+        self._last_probe_ok_at = 0.0
+        self._schedule_probe()
     
     async def _test_connection(self):
         """Test if VLLM server is running"""
         try:
-            async with self.session.get(f"{self.endpoint}/models") as response:
+            async with self.session.get(self._models_url) as response:
                 if response.status == 200:
                     models = await response.json()
                     logger.info(f"Available models: {[m['id'] for m in models.get('data', [])]}")
@@ -63,19 +210,42 @@ class VLLMHandler:
         except Exception as e:
             raise Exception(f"VLLM server not accessible at {self.endpoint}: {e}")
     
-    def register_tool(self, name: str, func: callable, description: str, parameters: Dict[str, Any]):
-        """Register a tool for the model to use"""
+    def register_tool(self, name: str, func: callable, description: str, parameters: Dict[str, Any],
+                      cache_ttl: float = 0.0):
+        """Register a tool for the model to use
+        
+        cache_ttl > 0 caches results of identical calls for that many seconds;
+        only use it for read-only tools.
+        """
         self.tools_registry[name] = {
             "function": func,
             "description": description,
-            "parameters": parameters
+            "parameters": parameters,
+            "cache_ttl": cache_ttl
         }
+        self._async_tools.pop(name, None)
+        self._sync_tools.pop(name, None)
+        if asyncio.iscoroutinefunction(func):
+            self._async_tools[name] = func
+        else:
+            self._sync_tools[name] = func
+        self._tools_schema_cache = None
+        self._tools_schema_bytes = None
         logger.info(f"Registered tool: {name}")
     
     def get_tools_schema(self) -> List[Dict[str, Any]]:
-        """Get OpenAI-compatible tools schema"""
+        """Get OpenAI-compatible tools schema
+        
+        The list is cached until the next register_tool and shared between
+        callers, so treat it as read-only.
+        """
+        if self._tools_schema_cache is not None:
+            return self._tools_schema_cache
+        
+        # Sorted by name so the prompt prefix is identical across requests,
+        # which lets the server's prefix cache hit
         tools = []
-        for name, tool in self.tools_registry.items():
+        for name, tool in sorted(self.tools_registry.items()):
             tools.append({
                 "type": "function",
                 "function": {
@@ -84,10 +254,13 @@ class VLLMHandler:
                     "parameters": tool["parameters"]
                 }
             })
+        self._tools_schema_cache = tools
+        if _Fragment is not None:
+            self._tools_schema_bytes = _dumps(tools)
         return tools
     
     async def transcribe_audio(self, audio_data: np.ndarray, sample_rate: int = 16000) -> str:
-        """Transcribe audio using Voxtral via OpenAI-compatible API with Whisper fallback"""
+        """Transcribe audio (float32 or int16 PCM) using Voxtral via OpenAI-compatible API with Whisper fallback"""
         # First try VLLM transcription
         vllm_result = await self._transcribe_with_vllm(audio_data, sample_rate)
         if vllm_result:
@@ -101,21 +274,71 @@ class VLLMHandler:
         logger.error("Both VLLM and Whisper transcription failed")
         return ""
     
+    async def transcribe_audio_stream(self, audio_data: np.ndarray, sample_rate: int = 16000) -> AsyncIterator[str]:
+        """Stream transcript text as VLLM produces it, with Whisper fallback
+        
+        Servers that ignore the stream flag answer with a single JSON body, which
+        is yielded whole; the Whisper fallback likewise yields one final text.
+        """
+        if not self.session:
+            await self.initialize()
+        
+        produced = False
+        try:
+            data = self._transcription_form(audio_data, sample_rate, stream=True)
+            async with self.session.post(self._transcriptions_url, data=data) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.warning(f"VLLM transcription failed: {response.status} - {error_text}")
+                elif response.content_type == "text/event-stream":
+                    async for event in _iter_sse_data(response):
+                        try:
+                            content = _loads(event)["choices"][0]["delta"].get("content")
+                        except (json.JSONDecodeError, KeyError, IndexError, TypeError):
+                            continue
+                        if content:
+                            produced = True
+                            yield content
+                else:
+                    transcript = (await response.json()).get("text", "")
+                    if transcript:
+                        produced = True
+                        yield transcript
+        except Exception as e:
+            logger.warning(f"VLLM transcription error: {e}")
+            self._connection_failed()
+        
+        if produced:
+            return
+        
+        if WHISPER_AVAILABLE:
+            logger.info("VLLM transcription failed, falling back to OpenAI Whisper")
+            transcript = await self._transcribe_with_whisper(audio_data, sample_rate)
+            if transcript:
+                yield transcript
+        else:
+            logger.error("Both VLLM and Whisper transcription failed")
+    
+    def _transcription_form(self, audio_data: np.ndarray, sample_rate: int, stream: bool = False) -> aiohttp.FormData:
+        """Multipart body for /audio/transcriptions"""
+        # Build the 16-bit WAV in memory: fixed header plus raw PCM bytes
+        pcm = np.ascontiguousarray(to_pcm16(audio_data).ravel()).astype("<i2", copy=False)
+        body = _wav_header(pcm.size, sample_rate) + pcm.tobytes()
+        
+        data = aiohttp.FormData()
+        data.add_field('file', body, filename='audio.wav', content_type='audio/wav')
+        data.add_field('model', self.model_name)
+        data.add_field('temperature', self._temp_transcription)
+        if stream:
+            data.add_field('stream', 'true')
+        return data
+    
     async def _transcribe_with_vllm(self, audio_data: np.ndarray, sample_rate: int = 16000) -> str:
         """Transcribe audio using VLLM/Voxtral"""
         try:
-            # Save audio to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                sf.write(temp_file.name, audio_data, sample_rate)
-                temp_path = temp_file.name
+            data = self._transcription_form(audio_data, sample_rate)
             
-            # Prepare multipart form data
-            data = aiohttp.FormData()
-            data.add_field('file', open(temp_path, 'rb'), filename='audio.wav', content_type='audio/wav')
-            data.add_field('model', self.model_name)
-            data.add_field('temperature', str(config.get("model", {}).get("temperature_transcription", 0.0)))
-            
-            async with self.session.post(f"{self.endpoint}/audio/transcriptions", data=data) as response:
+            async with self.session.post(self._transcriptions_url, data=data) as response:
                 if response.status == 200:
                     result = await response.json()
                     transcript = result.get("text", "")
@@ -128,30 +351,51 @@ class VLLMHandler:
                     
         except Exception as e:
             logger.warning(f"VLLM transcription error: {e}")
+            self._connection_failed()
             return ""
-        finally:
-            # Clean up temp file
-            try:
-                Path(temp_path).unlink()
-            except:
-                pass
     
     async def _transcribe_with_whisper(self, audio_data: np.ndarray, sample_rate: int = 16000) -> str:
         """Transcribe audio using OpenAI Whisper as fallback"""
         if not WHISPER_AVAILABLE:
             return ""
         
+        loop = asyncio.get_running_loop()
+        if self._whisper_model is None:
+            async with self._whisper_lock:
+                if self._whisper_model is None:
+                    try:
+                        self._whisper_model = await loop.run_in_executor(self._stt_pool, self._load_whisper_model)
+                    except Exception as e:
+                        logger.error(f"Failed to load Whisper model: {e}")
+                        return ""
+        
+        return await loop.run_in_executor(self._stt_pool, self._transcribe_with_whisper_sync, audio_data, sample_rate)
+    
+    def _load_whisper_model(self):
+        """Load the fallback Whisper model, on the GPU when there is one"""
+        import torch
+        
+        model_size = config.get("whisper.model_size", "base")
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Loading Whisper fallback model '{model_size}' on {device}")
+        return whisper.load_model(model_size, device=device)
+    
+    def _transcribe_with_whisper_sync(self, audio_data: np.ndarray, sample_rate: int = 16000) -> str:
+        """Blocking Whisper transcription, run on the STT thread pool"""
         try:
-            # Save audio to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                sf.write(temp_file.name, audio_data, sample_rate)
-                temp_path = temp_file.name
-            
-            # Load Whisper model (use base model for speed)
-            model = whisper.load_model("base")
+            # Whisper takes 16 kHz float32 arrays directly; no WAV round-trip
+            if audio_data.dtype == np.int16:
+                audio = audio_data.astype(np.float32) * np.float32(1.0 / 32768.0)
+            else:
+                audio = np.ascontiguousarray(audio_data, dtype=np.float32)
+            if sample_rate != 16000:
+                target = np.arange(int(audio.size * 16000 / sample_rate)) * (sample_rate / 16000)
+                audio = np.interp(target, np.arange(audio.size), audio).astype(np.float32)
             
             # Transcribe
-            result = model.transcribe(temp_path, language="en")
+            result = self._whisper_model.transcribe(
+                audio, language="en", fp16=self._whisper_model.device.type == "cuda"
+            )
             transcript = result["text"].strip()
             
             logger.debug(f"Whisper Transcription: {transcript}")
@@ -160,52 +404,44 @@ class VLLMHandler:
         except Exception as e:
             logger.error(f"Whisper transcription error: {e}")
             return ""
-        finally:
-            # Clean up temp file
-            try:
-                Path(temp_path).unlink()
-            except:
-                pass
     
     async def chat_completion(
         self, 
         messages: List[Dict[str, str]], 
         tools: Optional[List[Dict[str, Any]]] = None,
-        stream: bool = False
+        stream: bool = False,
+        execute_tools: bool = True
     ) -> Union[str, Dict[str, Any]]:
-        """Generate chat completion with optional tool calling"""
+        """Generate chat completion with optional tool calling
+        
+        Requested tools are run here and their results returned as text. With
+        execute_tools=False a response that requests tools is returned as
+        {"content": ..., "tool_calls": [...]} so the caller can run them with
+        execute_tool_calls and follow up itself.
+        
+        Concurrent calls are sent as independent requests on the shared session;
+        the VLLM server batches in-flight requests itself (continuous batching),
+        so no client-side coalescing is done here.
+        """
         
         if not self.session:
             await self.initialize()
         
-        # Prepare request payload
-        payload = {
-            "model": self.model_name,
-            "messages": self._format_messages_for_api(messages, tools),
-            "temperature": config.get("model", {}).get("temperature_chat", 0.2),
-            "top_p": config.get("model", {}).get("top_p", 0.95),
-            "max_tokens": config.get("model", {}).get("max_tokens", 2048),
-            "stream": stream
-        }
-        
-        # Add tools if provided
-        if tools and config.get("model", {}).get("enable_tool_use", True):
-            payload["tools"] = tools
-            payload["tool_choice"] = "auto"
+        payload = self._build_chat_payload(messages, tools, stream)
         
         try:
             async with self.session.post(
-                f"{self.endpoint}/chat/completions", 
-                json=payload,
+                self._chat_url, 
+                data=_dumps(payload),
                 headers={"Content-Type": "application/json"}
             ) as response:
                 
                 if response.status == 200:
                     if stream:
-                        return await self._handle_stream_response(response)
+                        return await self._handle_stream_response(response, execute_tools)
                     else:
                         result = await response.json()
-                        return await self._handle_completion_response(result)
+                        return await self._handle_completion_response(result, execute_tools)
                 else:
                     error_text = await response.text()
                     logger.error(f"Chat completion failed: {response.status} - {error_text}")
@@ -213,36 +449,80 @@ class VLLMHandler:
                     
         except Exception as e:
             logger.error(f"Chat completion error: {e}")
+            self._connection_failed()
             return f"Error: {str(e)}"
     
-    def _format_messages_for_api(self, messages: List[Dict[str, str]], tools: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, str]]:
-        """Format messages for OpenAI-compatible API"""
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]]
+    ) -> AsyncIterator[str]:
+        """Stream content deltas of a chat completion as they are generated
         
-        # System message with Linux context and tool information
-        system_content = """You are Voxtral, a voice-controlled AI assistant running on Linux (Debian 12 GNOME Wayland).
-
-You help users with:
-- Voice-to-text transcription and typing
-- Shell commands and system operations
-- Web searches and information lookup
-- File operations and text editing
-- General productivity tasks
-
-You are cursor-aware and can type text directly where the user's cursor is positioned.
-Be concise and helpful. When using tools, explain what you're doing briefly."""
-
-        if tools:
-            system_content += "\n\nAvailable tools:\n"
-            for tool in tools:
-                func_info = tool.get("function", {})
-                system_content += f"- {func_info.get('name', 'unknown')}: {func_info.get('description', 'No description')}\n"
+        Tools are not offered on this path since tool calls need the full response.
+        """
+        if not self.session:
+            await self.initialize()
+        
+        payload = self._build_chat_payload(messages, None, stream=True)
+        
+        async with self.session.post(
+            self._chat_url,
+            data=_dumps(payload),
+            headers={"Content-Type": "application/json"}
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"Chat completion failed: {response.status} - {error_text}")
+            
+            async for data in _iter_sse_data(response):
+                try:
+                    chunk = _loads(data)
+                except json.JSONDecodeError:
+                    continue
+                
+                content = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+    
+    def _build_chat_payload(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[List[Dict[str, Any]]],
+        stream: bool
+    ) -> Dict[str, Any]:
+        """Prepare a chat completion request payload"""
+        payload = {
+            "model": self.model_name,
+            "messages": self._format_messages_for_api(messages),
+            "temperature": self._temp_chat,
+            "top_p": self._top_p,
+            "max_tokens": self._max_tokens,
+            "stream": stream
+        }
         
-        formatted_messages = [{"role": "system", "content": system_content}]
+        # Add tools if provided
+        if tools and self._enable_tools:
+            # The registry schema is spliced in pre-serialized instead of re-encoded
+            if tools is self._tools_schema_cache and self._tools_schema_bytes is not None:
+                payload["tools"] = _Fragment(self._tools_schema_bytes)
+            else:
+                payload["tools"] = tools
+            payload["tool_choice"] = "auto"
+        
+        return payload
+    
+    def _format_messages_for_api(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Format messages for OpenAI-compatible API
+        
+        Tools travel only in the request's "tools" field, so the system prompt
+        stays static and its prefix is cached across every request.
+        """
+        formatted_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
         formatted_messages.extend(messages)
         
         return formatted_messages
     
-    async def _handle_completion_response(self, result: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    async def _handle_completion_response(self, result: Dict[str, Any], execute_tools: bool = True) -> Union[str, Dict[str, Any]]:
         """Handle non-streaming completion response"""
         try:
             choice = result.get("choices", [{}])[0]
@@ -250,7 +530,9 @@ Be concise and helpful. When using tools, explain what you're doing briefly."""
             
             # Check for tool calls
             if "tool_calls" in message and message["tool_calls"]:
-                return await self._execute_tool_calls(message["tool_calls"])
+                if not execute_tools:
+                    return {"content": message.get("content") or "", "tool_calls": message["tool_calls"]}
+                return await self.execute_tool_calls(message["tool_calls"])
             
             # Regular text response
             return message.get("content", "No response generated")
@@ -259,75 +541,144 @@ Be concise and helpful. When using tools, explain what you're doing briefly."""
             logger.error(f"Error handling completion response: {e}")
             return f"Error processing response: {str(e)}"
     
-    async def _handle_stream_response(self, response) -> str:
+    async def _handle_stream_response(self, response, execute_tools: bool = True) -> Union[str, Dict[str, Any]]:
         """Handle streaming completion response"""
-        full_response = ""
+        # Fragments are joined once at the end; += on a str is quadratic
+        parts = []
+        append = parts.append
         tool_calls = []
+        extend_tools = tool_calls.extend
         
         try:
-            async for line in response.content:
-                line = line.decode('utf-8').strip()
-                if line.startswith("data: "):
-                    data = line[6:]
-                    if data == "[DONE]":
-                        break
-                    
-                    try:
-                        chunk = json.loads(data)
-                        choice = chunk.get("choices", [{}])[0]
-                        delta = choice.get("delta", {})
-                        
-                        if "content" in delta and delta["content"]:
-                            full_response += delta["content"]
-                        
-                        if "tool_calls" in delta:
-                            tool_calls.extend(delta["tool_calls"])
-                            
-                    except json.JSONDecodeError:
-                        continue
+            async for data in _iter_sse_data(response):
+                try:
+                    delta = _loads(data)["choices"][0]["delta"]
+                except (json.JSONDecodeError, KeyError, IndexError, TypeError):
+                    continue
+                
+                content = delta.get("content")
+                if content:
+                    append(content)
+                
+                calls = delta.get("tool_calls")
+                if calls:
+                    extend_tools(calls)
             
             # Execute tool calls if present
             if tool_calls:
-                return await self._execute_tool_calls(tool_calls)
+                if not execute_tools:
+                    return {"content": "".join(parts), "tool_calls": tool_calls}
+                return await self.execute_tool_calls(tool_calls)
             
-            return full_response
+            return "".join(parts)
             
         except Exception as e:
             logger.error(f"Error handling stream response: {e}")
             return f"Error processing stream: {str(e)}"
     
-    async def _execute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> str:
-        """Execute tool calls and return results"""
+    async def execute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> str:
+        """Execute tool calls and return results in call order
+        
+        Read-only tools (cache_ttl > 0) run concurrently in the background;
+        every other tool runs one at a time in the order the model emitted them,
+        so e.g. type_text followed by press_key never interleaves.
+        """
+        if not tool_calls:
+            return "No tool results"
+        
+        background = {}
+        for i, tool_call in enumerate(tool_calls):
+            tool = self.tools_registry.get(tool_call.get("function", {}).get("name"))
+            if tool is not None and tool["cache_ttl"] > 0:
+                background[i] = asyncio.ensure_future(self._execute_tool_call(tool_call))
+        
         results = []
+        for i, tool_call in enumerate(tool_calls):
+            if i not in background:
+                results.append(await self._execute_tool_call(tool_call))
+            else:
+                results.append(None)
+        
+        for i, task in background.items():
+            results[i] = await task
+        return "\n".join(results)
+    
+    async def _execute_tool_call(self, tool_call: Dict[str, Any]) -> str:
+        """Execute a single tool call and format its result line"""
+        function = tool_call.get("function", {})
+        function_name = function.get("name")
+        try:
+            arguments = _loads(function.get("arguments", "{}"))
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.warning(f"Invalid arguments for tool {function_name}: {e}")
+            return f"Tool '{function_name}' received invalid arguments: {e}"
         
-        for tool_call in tool_calls:
-            try:
-                function_name = tool_call.get("function", {}).get("name")
-                arguments = json.loads(tool_call.get("function", {}).get("arguments", "{}"))
+        try:
+            if function_name in self.tools_registry:
+                result = await self._run_tool(function_name, arguments)
                 
-                if function_name in self.tools_registry:
-                    tool_func = self.tools_registry[function_name]["function"]
-                    
-                    if asyncio.iscoroutinefunction(tool_func):
-                        result = await tool_func(**arguments)
-                    else:
-                        result = tool_func(**arguments)
-                    
-                    results.append(f"Tool '{function_name}' executed: {result}")
-                    logger.info(f"Executed tool {function_name} with result: {result}")
-                else:
-                    results.append(f"Tool '{function_name}' not found")
-                    logger.warning(f"Tool {function_name} not registered")
-                    
-            except Exception as e:
-                error_msg = f"Tool execution failed: {str(e)}"
-                results.append(error_msg)
-                logger.error(f"Tool execution error: {e}")
+                logger.info(f"Executed tool {function_name} with result: {result}")
+                return f"Tool '{function_name}' executed: {result}"
+            else:
+                logger.warning(f"Tool {function_name} not registered")
+                return f"Tool '{function_name}' not found"
+                
+        except Exception as e:
+            logger.error(f"Tool execution error: {e}")
+            return f"Tool execution failed: {str(e)}"
+    
+    async def _run_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Run a registered tool; read-only tools are deduplicated and cached"""
+        tool = self.tools_registry[name]
+        if tool["cache_ttl"] <= 0:
+            # Side-effecting tools run once per call, never merged or cached
+            return await self._call_tool(name, arguments)
+        
+        key = (name, json.dumps(arguments, sort_keys=True))
+        
+        cached = self._tool_result_cache.get(key)
+        if cached is not None:
+            expires, result = cached
+            if expires > time.monotonic():
+                return result
+            del self._tool_result_cache[key]
+        
+        future = self._inflight_tools.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._call_tool(name, arguments))
+            self._inflight_tools[key] = future
+            future.add_done_callback(lambda _: self._inflight_tools.pop(key, None))
         
-        return "\n".join(results) if results else "No tool results"
+        # Shield so one cancelled caller does not cancel the shared execution
+        result = await asyncio.shield(future)
+        
+        self._cache_tool_result(key, time.monotonic() + tool["cache_ttl"], result)
+        return result
+    
+    def _cache_tool_result(self, key: tuple, expires: float, result: Any):
+        """Store a read-only tool result, sweeping expired entries to stay bounded"""
+        cache = self._tool_result_cache
+        if len(cache) >= TOOL_CACHE_MAX:
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in cache.items() if exp <= now]:
+                del cache[stale]
+            # Still full of live entries: drop the oldest insertions
+            while len(cache) >= TOOL_CACHE_MAX:
+                del cache[next(iter(cache))]
+        cache[key] = (expires, result)
+    
+    async def _call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Call a tool function; synchronous tools run in a worker thread"""
+        tool_func = self._async_tools.get(name)
+        if tool_func is not None:
+            return await tool_func(**arguments)
+        return await asyncio.to_thread(self._sync_tools[name], **arguments)
     
     async def shutdown(self):
         """Shutdown the HTTP session"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
         if self.session:
             await self.session.close()
             self.session = None
@@ -7,9 +7,11 @@ Implements Ctrl+Alt hotkey activation for voice transcription
 import sys
 import os
 import threading
+import queue
 import time
 import logging
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Optional, Dict, Any
 from dataclasses import dataclass
 
@@ -32,6 +34,24 @@ except ImportError as e:
 
 from config.settings import config
 
+# Modifiers get fixed bits in the pressed-key mask; other configured keys are
+# assigned higher bits when the hotkey is compiled
+MODIFIER_BITS = {"ctrl": 1, "alt": 2, "shift": 4, "cmd": 8}
+
+# Events handed from the pynput listener thread to the dispatch worker
+EVENT_ACTIVATE = 1
+EVENT_DEACTIVATE = 2
+
+if PYNPUT_AVAILABLE:
+    _MODIFIER_KEY_BITS = {
+        Key.ctrl: 1, Key.ctrl_l: 1, Key.ctrl_r: 1,
+        Key.alt: 2, Key.alt_l: 2, Key.alt_r: 2,
+        Key.shift: 4, Key.shift_l: 4, Key.shift_r: 4,
+        Key.cmd: 8,
+    }
+else:
+    _MODIFIER_KEY_BITS = {}
+
 @dataclass
 class HotkeyConfig:
     """Configuration for hotkey behavior"""
@@ -48,18 +68,27 @@ class HotkeyManager:
         self.listener = None
         self.is_listening = False
         self.voice_active = False
-        self.pressed_keys = set()
+        self._mask = 0
         
         # Load configuration
         self.config = self._load_hotkey_config()
+        self._compile_hotkey()
         
         # Callbacks
         self.activation_callback = None
         self.deactivation_callback = None
         self.status_callback = None
         
-        # Thread safety
+        # Thread safety: the lock only guards the key mask; activation work and
+        # callbacks run in order on one long-lived worker fed by a queue, so the
+        # listener thread never blocks on them or spawns threads. Callbacks run
+        # one after another there, so a slow callback delays later events;
+        # notification/sound feedback runs on its own thread for that reason
         self.lock = threading.Lock()
+        self._events = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._dispatch_events, name="hotkey-events", daemon=True)
+        self._worker.start()
+        self._feedback_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hotkey-feedback")
         
     def _load_hotkey_config(self) -> HotkeyConfig:
         """Load hotkey configuration from settings"""
@@ -72,12 +101,34 @@ class HotkeyManager:
             toggle_mode=hotkey_config.get("toggle_mode", True)
         )
     
+    def _compile_hotkey(self):
+        """Precompute the bitmask the configured key combination requires"""
+        self._key_bits: Dict[str, int] = {}
+        required = 0
+        next_bit = 16
+        for name in self.config.keys:
+            name = name.lower()
+            bit = MODIFIER_BITS.get(name) or self._key_bits.get(name)
+            if bit is None:
+                bit = self._key_bits[name] = next_bit
+                next_bit <<= 1
+            required |= bit
+        self._required_mask = required
+        self._mask = 0
+    
     def set_activation_callback(self, callback: Callable[[], None]):
-        """Set callback for voice activation"""
+        """Set callback for voice activation
+        
+        Runs on the hotkey event worker; return quickly and hand long work
+        (e.g. recording) to another thread.
+        """
         self.activation_callback = callback
     
     def set_deactivation_callback(self, callback: Callable[[], None]):
-        """Set callback for voice deactivation"""
+        """Set callback for voice deactivation
+        
+        Runs on the hotkey event worker; return quickly.
+        """
         self.deactivation_callback = callback
     
     def set_status_callback(self, callback: Callable[[str], None]):
@@ -122,7 +173,7 @@ class HotkeyManager:
                 self.listener = None
             
             self.is_listening = False
-            self.pressed_keys.clear()
+            self._mask = 0
             
             self.logger.info("Hotkey unregistered")
             self._notify_status("Hotkey unregistered")
@@ -135,15 +186,17 @@ class HotkeyManager:
     def _on_key_press(self, key):
         """Handle key press events"""
         try:
+            bit = self._key_bit(key)
+            if not bit:
+                return
+            
             with self.lock:
-                # Convert key to string representation
-                key_str = self._key_to_string(key)
-                if key_str:
-                    self.pressed_keys.add(key_str)
-                    
-                    # Check if our hotkey combination is pressed
-                    if self._is_hotkey_pressed():
-                        self._handle_hotkey_activation()
+                self._mask |= bit
+                pressed = self._is_hotkey_pressed()
+            
+            # Check if our hotkey combination is pressed
+            if pressed:
+                self._events.put(EVENT_ACTIVATE)
                         
         except Exception as e:
             self.logger.error(f"Key press error: {e}")
@@ -151,19 +204,38 @@ class HotkeyManager:
     def _on_key_release(self, key):
         """Handle key release events"""
         try:
+            bit = self._key_bit(key)
+            if not bit:
+                return
+            
             with self.lock:
-                key_str = self._key_to_string(key)
-                if key_str:
-                    self.pressed_keys.discard(key_str)
-                    
-                    # Handle push-to-talk mode
-                    if not self.config.toggle_mode and not self._is_hotkey_pressed():
-                        if self.voice_active:
-                            self._handle_hotkey_deactivation()
+                was_pressed = self._is_hotkey_pressed()
+                self._mask &= ~bit
+                pressed = self._is_hotkey_pressed()
+            
+            # Handle push-to-talk mode. voice_active belongs to the worker and may
+            # not reflect a still-queued activation yet, so always queue the
+            # deactivation on release; _deactivate_voice ignores it if already off
+            if not self.config.toggle_mode and was_pressed and not pressed:
+                self._events.put(EVENT_DEACTIVATE)
                             
         except Exception as e:
             self.logger.error(f"Key release error: {e}")
     
+    def _key_bit(self, key) -> int:
+        """Mask bit for a key, or 0 if it is not part of the hotkey"""
+        try:
+            bit = _MODIFIER_KEY_BITS.get(key)
+        except TypeError:
+            bit = None
+        if bit is not None:
+            return bit & self._required_mask
+        
+        # Only non-modifier hotkeys need the string conversion
+        if not self._key_bits:
+            return 0
+        return self._key_bits.get(self._key_to_string(key), 0)
+    
     def _key_to_string(self, key) -> Optional[str]:
         """Convert pynput key to string"""
         try:
@@ -186,8 +258,16 @@ class HotkeyManager:
     
     def _is_hotkey_pressed(self) -> bool:
         """Check if the configured hotkey combination is pressed"""
-        required_keys = set(key.lower() for key in self.config.keys)
-        return required_keys.issubset(self.pressed_keys)
+        return (self._mask & self._required_mask) == self._required_mask
+    
+    def _dispatch_events(self):
+        """Worker loop running activation work queued by the listener"""
+        while True:
+            event = self._events.get()
+            if event == EVENT_ACTIVATE:
+                self._handle_hotkey_activation()
+            elif event == EVENT_DEACTIVATE:
+                self._handle_hotkey_deactivation()
     
     def _handle_hotkey_activation(self):
         """Handle hotkey activation"""
@@ -222,12 +302,12 @@ class HotkeyManager:
         self.logger.info("🎙️ Voice activated by hotkey")
         
         # Provide feedback
-        self._provide_feedback("activated")
+        self._feedback_pool.submit(self._provide_feedback, "activated")
         
-        # Call activation callback
+        # Call activation callback (on the event worker; keep it short)
         if self.activation_callback:
             try:
-                threading.Thread(target=self.activation_callback, daemon=True).start()
+                self.activation_callback()
             except Exception as e:
                 self.logger.error(f"Activation callback error: {e}")
         
@@ -242,12 +322,12 @@ class HotkeyManager:
         self.logger.info("⏹️ Voice deactivated by hotkey")
         
         # Provide feedback
-        self._provide_feedback("deactivated")
+        self._feedback_pool.submit(self._provide_feedback, "deactivated")
         
-        # Call deactivation callback
+        # Call deactivation callback (on the event worker; keep it short)
         if self.deactivation_callback:
             try:
-                threading.Thread(target=self.deactivation_callback, daemon=True).start()
+                self.deactivation_callback()
             except Exception as e:
                 self.logger.error(f"Deactivation callback error: {e}")
         
@@ -340,6 +420,7 @@ class HotkeyManager:
             
             # Reload configuration
             self.config = self._load_hotkey_config()
+            self._compile_hotkey()
             
             # Restart listener if enabled
             if self.config.enabled:
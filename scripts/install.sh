@@ -253,7 +253,7 @@ echo "============================================"
 echo
 echo "📋 Next steps:"
 echo "1. Start the VLLM server:"
-echo "   vllm serve mistralai/Voxtral-Mini-3B-2507 --tokenizer_mode mistral --config_format mistral --load_format mistral"
+echo "   vllm serve mistralai/Voxtral-Mini-3B-2507 --tokenizer_mode mistral --config_format mistral --load_format mistral --enable_prefix_caching"
 echo
 echo "2. Launch the tray application:"
 echo "   ./venv/bin/python scripts/tray_icon.py"
@@ -2,31 +2,44 @@
 """
 Simple script to kill all voxtral tray processes
 """
-import subprocess
+import os
 import sys
 
+import psutil
+
 def kill_all_tray_processes():
     """Kill all voxtral tray processes"""
     try:
         print("🔥 Killing all voxtral tray processes...")
         
-        # Kill all voxtral processes
-        result = subprocess.run(['pkill', '-9', '-f', 'voxtral_tray'], 
-                              capture_output=True, text=True)
+        # One /proc scan finds the victims; no pkill/pgrep forks
+        own_pid = os.getpid()
+        victims = []
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            cmdline = proc.info['cmdline']
+            if proc.info['pid'] != own_pid and cmdline and 'voxtral_tray' in ' '.join(cmdline):
+                victims.append(proc)
         
-        if result.returncode == 0:
-            print("✅ All tray processes killed")
-        else:
+        if not victims:
             print("⚠️ No tray processes found or already killed")
-            
+            print("✅ Confirmed: All tray processes are gone")
+            return
+        
+        # Kill all voxtral processes
+        for proc in victims:
+            try:
+                proc.kill()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        print("✅ All tray processes killed")
+        
         # Verify they're gone
-        check_result = subprocess.run(['pgrep', '-f', 'voxtral_tray'], 
-                                    capture_output=True, text=True)
+        _, alive = psutil.wait_procs(victims, timeout=1)
         
-        if check_result.returncode != 0:
+        if not alive:
             print("✅ Confirmed: All tray processes are gone")
         else:
-            print("⚠️ Some processes may still be running")
+            print(f"⚠️ Some processes may still be running: {[p.pid for p in alive]}")
             
     except Exception as e:
         print(f"❌ Error killing processes: {e}")
@@ -7,6 +7,8 @@ Provides a simple HTTP server that mimics VLLM's OpenAI-compatible API
 import asyncio
 import json
 import logging
+import re
+import socket
 from typing import Dict, Any
 from aiohttp import web, MultipartReader
 import tempfile
@@ -15,10 +17,87 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prefer orjson (the "accel" extra); it encodes straight to bytes
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    
+    _loads = json.loads
+
+# uvloop gives the mock a faster event loop when it is installed
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+def _json_response(obj: Any, status: int = 200) -> web.Response:
+    """JSON response encoded with _dumps"""
+    return web.Response(body=_dumps(obj), status=status, content_type='application/json')
+
+# Uploaded audio is spooled to tmpfs when available
+TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# Uploads are read and written in large chunks to keep syscalls per MB low
+UPLOAD_CHUNK = 1 << 20
+# The canned transcription never looks at the audio, so by default uploads are
+# drained without touching disk; MOCK_DISCARD_AUDIO=0 spools them as before
+DISCARD_AUDIO = os.environ.get("MOCK_DISCARD_AUDIO", "1") != "0"
+# Optional artificial transcription latency for more realistic benchmarks
+MOCK_LATENCY = float(os.environ.get("MOCK_LATENCY_MS", "0")) / 1000
+# MOCK_REUSE_PORT=1 lets several mock processes share the port (SO_REUSEPORT).
+# Off by default so a second or stale mock fails with "address in use" instead
+# of silently splitting requests with it
+REUSE_PORT = os.environ.get("MOCK_REUSE_PORT", "0") == "1" and hasattr(socket, "SO_REUSEPORT")
+
+# Mock transcription - in reality this would process the audio
+# For testing, we'll return a simple mock transcription
+_TRANSCRIPTION_BODY = _dumps({
+    "text": "Hello, this is a test transcription from the mock server."
+})
+
+# Keyword scans run as one case-insensitive regex pass. The response scan uses
+# a lookahead so overlapping keywords (e.g. "hi" inside "search") are all seen,
+# matching the substring checks they replace.
+_TOOL_RE = re.compile(r"type|search|run|execute|open|find", re.IGNORECASE)
+_KEYWORD_RE = re.compile(r"(?=(hello|hi|type|search|run|execute))", re.IGNORECASE)
+
+def _keywords(user_message: str) -> set:
+    """Lowercased response keywords present in the message"""
+    return {k.lower() for k in _KEYWORD_RE.findall(user_message)}
+
+# Everything in a chat completion except the message and finish reason is
+# fixed, so responses splice those two into pre-encoded bytes
+_CHAT_TEMPLATE = (
+    b'{"id":"chatcmpl-mock123","object":"chat.completion","created":1234567890,'
+    b'"model":"mistralai/Voxtral-Mini-3B-2507","choices":[{"index":0,"message":%s,'
+    b'"finish_reason":"%s"}],"usage":{"prompt_tokens":50,"completion_tokens":20,'
+    b'"total_tokens":70}}'
+)
+
 class MockVLLMServer:
     def __init__(self, host="0.0.0.0", port=8000):
         self.host = host
         self.port = port
+        # Static endpoint bodies are encoded once
+        self._models_bytes = _dumps({
+            "object": "list",
+            "data": [
+                {
+                    "id": "mistralai/Voxtral-Mini-3B-2507",
+                    "object": "model",
+                    "created": 1234567890,
+                    "owned_by": "mistralai"
+                }
+            ]
+        })
+        self._health_bytes = b'{"status":"healthy"}'
         self.app = web.Application()
         self.setup_routes()
     
@@ -31,28 +110,19 @@ class MockVLLMServer:
     
     async def list_models(self, request):
         """List available models"""
-        return web.json_response({
-            "object": "list",
-            "data": [
-                {
-                    "id": "mistralai/Voxtral-Mini-3B-2507",
-                    "object": "model",
-                    "created": 1234567890,
-                    "owned_by": "mistralai"
-                }
-            ]
-        })
+        return web.Response(body=self._models_bytes, content_type='application/json')
     
     async def chat_completions(self, request):
         """Handle chat completions"""
         try:
-            data = await request.json()
+            data = _loads(await request.read())
             messages = data.get("messages", [])
             tools = data.get("tools", [])
             
             # Get the last user message
             user_message = ""
-            for msg in reversed(messages):
+            for i in range(len(messages) - 1, -1, -1):
+                msg = messages[i]
                 if msg.get("role") == "user":
                     user_message = msg.get("content", "")
                     break
@@ -66,37 +136,19 @@ class MockVLLMServer:
                 tool_calls = self._generate_tool_call(user_message, tools)
                 response_content = ""
             
-            response = {
-                "id": "chatcmpl-mock123",
-                "object": "chat.completion",
-                "created": 1234567890,
-                "model": "mistralai/Voxtral-Mini-3B-2507",
-                "choices": [
-                    {
-                        "index": 0,
-                        "message": {
-                            "role": "assistant",
-                            "content": response_content,
-                        },
-                        "finish_reason": "stop"
-                    }
-                ],
-                "usage": {
-                    "prompt_tokens": 50,
-                    "completion_tokens": 20,
-                    "total_tokens": 70
-                }
-            }
+            message = {"role": "assistant", "content": response_content}
+            finish_reason = b"stop"
             
             if tool_calls:
-                response["choices"][0]["message"]["tool_calls"] = tool_calls
-                response["choices"][0]["finish_reason"] = "tool_calls"
+                message["tool_calls"] = tool_calls
+                finish_reason = b"tool_calls"
             
-            return web.json_response(response)
+            body = _CHAT_TEMPLATE % (_dumps(message), finish_reason)
+            return web.Response(body=body, content_type='application/json')
             
         except Exception as e:
             logger.error(f"Chat completion error: {e}")
-            return web.json_response(
+            return _json_response(
                 {"error": {"message": str(e), "type": "server_error"}},
                 status=500
             )
@@ -108,14 +160,25 @@ class MockVLLMServer:
             reader = MultipartReader.from_response(request)
             
             audio_file = None
+            got_audio = False
             model = "mistralai/Voxtral-Mini-3B-2507"
             temperature = 0.0
             
             async for part in reader:
                 if part.name == 'file':
+                    got_audio = True
+                    if DISCARD_AUDIO:
+                        while await part.read_chunk(UPLOAD_CHUNK):
+                            pass
+                        continue
+                    
                     # Save audio file temporarily
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp:
-                        async for chunk in part:
+                    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav', dir=TMP_DIR,
+                                                     buffering=UPLOAD_CHUNK) as tmp:
+                        while True:
+                            chunk = await part.read_chunk(UPLOAD_CHUNK)
+                            if not chunk:
+                                break
                             tmp.write(chunk)
                         audio_file = tmp.name
                 elif part.name == 'model':
@@ -123,63 +186,59 @@ class MockVLLMServer:
                 elif part.name == 'temperature':
                     temperature = float((await part.text()).strip())
             
-            if not audio_file:
-                return web.json_response(
+            if not got_audio:
+                return _json_response(
                     {"error": {"message": "No audio file provided", "type": "invalid_request"}},
                     status=400
                 )
             
-            # Mock transcription - in reality this would process the audio
-            # For testing, we'll return a simple mock transcription
-            mock_transcription = "Hello, this is a test transcription from the mock server."
-            
             # Clean up temp file
-            try:
-                os.unlink(audio_file)
-            except:
-                pass
+            if audio_file:
+                try:
+                    os.unlink(audio_file)
+                except:
+                    pass
+            
+            if MOCK_LATENCY > 0:
+                await asyncio.sleep(MOCK_LATENCY)
             
-            return web.json_response({
-                "text": mock_transcription
-            })
+            return web.Response(body=_TRANSCRIPTION_BODY, content_type='application/json')
             
         except Exception as e:
             logger.error(f"Audio transcription error: {e}")
-            return web.json_response(
+            return _json_response(
                 {"error": {"message": str(e), "type": "server_error"}},
                 status=500
             )
     
     async def health_check(self, request):
         """Health check endpoint"""
-        return web.json_response({"status": "healthy"})
+        return web.Response(body=self._health_bytes, content_type='application/json')
     
     def _generate_mock_response(self, user_message: str, tools: list) -> str:
         """Generate a mock response based on user input"""
-        user_lower = user_message.lower()
+        found = _keywords(user_message)
         
-        if "hello" in user_lower or "hi" in user_lower:
+        if "hello" in found or "hi" in found:
             return "Hello! I'm the Voxtral mock server. How can I help you today?"
-        elif "type" in user_lower:
+        elif "type" in found:
             return "I'll help you type that text."
-        elif "search" in user_lower:
+        elif "search" in found:
             return "I'll search for that information."
-        elif "run" in user_lower or "execute" in user_lower:
+        elif "run" in found or "execute" in found:
             return "I'll execute that command safely."
         else:
             return f"I understand you said: '{user_message}'. How can I assist you?"
     
     def _should_use_tool(self, user_message: str) -> bool:
         """Determine if a tool should be used"""
-        user_lower = user_message.lower()
-        tool_keywords = ["type", "search", "run", "execute", "open", "find"]
-        return any(keyword in user_lower for keyword in tool_keywords)
+        return _TOOL_RE.search(user_message) is not None
     
     def _generate_tool_call(self, user_message: str, tools: list) -> list:
         """Generate a mock tool call"""
-        user_lower = user_message.lower()
+        found = _keywords(user_message)
         
-        if "type" in user_lower and tools:
+        if "type" in found and tools:
             # Find type_text tool
             for tool in tools:
                 if tool.get("function", {}).get("name") == "type_text":
@@ -188,11 +247,11 @@ class MockVLLMServer:
                         "type": "function",
                         "function": {
                             "name": "type_text",
-                            "arguments": json.dumps({"text": "Hello from mock server!"})
+                            "arguments": _dumps({"text": "Hello from mock server!"}).decode()
                         }
                     }]
         
-        elif "search" in user_lower and tools:
+        elif "search" in found and tools:
             # Find search tool
             for tool in tools:
                 if "search" in tool.get("function", {}).get("name", ""):
@@ -201,11 +260,11 @@ class MockVLLMServer:
                         "type": "function",
                         "function": {
                             "name": tool["function"]["name"],
-                            "arguments": json.dumps({"query": "test search"})
+                            "arguments": _dumps({"query": "test search"}).decode()
                         }
                     }]
         
-        elif "run" in user_lower and tools:
+        elif "run" in found and tools:
             # Find shell tool
             for tool in tools:
                 if tool.get("function", {}).get("name") == "run_shell":
@@ -214,7 +273,7 @@ class MockVLLMServer:
                         "type": "function",
                         "function": {
                             "name": "run_shell",
-                            "arguments": json.dumps({"command": "echo 'mock command'"})
+                            "arguments": _dumps({"command": "echo 'mock command'"}).decode()
                         }
                     }]
         
@@ -222,9 +281,13 @@ class MockVLLMServer:
     
     async def start(self):
         """Start the server"""
-        runner = web.AppRunner(self.app)
+        # No per-request access log; aiohttp already sets TCP_NODELAY on connections
+        runner = web.AppRunner(self.app, access_log=None)
         await runner.setup()
-        site = web.TCPSite(runner, self.host, self.port)
+        site = web.TCPSite(
+            runner, self.host, self.port, backlog=4096,
+            reuse_port=REUSE_PORT
+        )
         await site.start()
         logger.info(f"Mock VLLM server started on http://{self.host}:{self.port}")
         
@@ -242,4 +305,6 @@ async def main():
     await server.start()
 
 if __name__ == "__main__":
+    if UVLOOP_AVAILABLE:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file
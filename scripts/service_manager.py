@@ -4,7 +4,9 @@ Voxtral Service Manager
 Prevents duplicate instances and manages service lifecycle
 """
 
+import fcntl
 import os
+import re
 import sys
 import psutil
 import subprocess
@@ -20,6 +22,59 @@ sys.path.insert(0, str(project_root))
 
 from config.settings import config
 
+# Command-line / process-name fragments that identify a Voxtral process
+_VOXTRAL_INDICATORS = (
+    'voxtral_tray_gtk.py',
+    'voxtral_tray_unified.py',
+    'tray_icon.py',
+    'agent_main.py',
+    'voxtral-tray',
+    'VoxtralTrayGTK',
+    'VoxtralTrayApp',
+    'VoxtralTrayUnified'
+)
+# All indicators as one case-insensitive alternation: a single C-level scan per
+# string, with a bytes twin for raw /proc data
+_VOXTRAL_RE = re.compile('|'.join(map(re.escape, _VOXTRAL_INDICATORS)), re.IGNORECASE)
+_VOXTRAL_BYTES_RE = re.compile(b'|'.join(re.escape(ind.encode()) for ind in _VOXTRAL_INDICATORS), re.IGNORECASE)
+
+def _iter_linux_procs():
+    """Yield (pid, raw cmdline bytes) for every process with a command line
+    
+    One open+read per process straight from /proc; processes that exit or
+    cannot be read mid-scan are skipped.
+    """
+    with os.scandir('/proc') as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry.name}/cmdline', 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            if raw:
+                yield int(entry.name), raw
+
+def _read_proc_name(pid: int) -> str:
+    """Process name from /proc/<pid>/comm"""
+    try:
+        with open(f'/proc/{pid}/comm', 'rb') as f:
+            return f.read().rstrip(b'\n').decode('utf-8', 'replace')
+    except OSError:
+        return ''
+
+def _read_proc_start_time(pid: int) -> float:
+    """Process start time as a Unix timestamp, computed like psutil's create_time"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return 0.0
+    # Fields after the parenthesised comm start at field 3; starttime is field 22
+    start_ticks = int(stat.rsplit(b')', 1)[1].split()[19])
+    return psutil.boot_time() + start_ticks / os.sysconf('SC_CLK_TCK')
+
 @dataclass
 class ProcessInfo:
     """Information about a running process"""
@@ -28,6 +83,7 @@ class ProcessInfo:
     cmdline: List[str]
     port: Optional[int]
     start_time: float
+    cmdline_str: str = ""  # cmdline joined with spaces, built once at detection
 
 class ServiceManager:
     """Manages Voxtral service instances and prevents duplicates"""
@@ -37,9 +93,19 @@ class ServiceManager:
         self.project_root = project_root
         self.lock_file = Path.home() / ".local/share/voxtral/voxtral.lock"
         self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+        # Descriptor holding the instance flock while this process owns it
+        self._lock_fd: Optional[int] = None
+        # (monotonic timestamp, value) of the last systemctl is-active query
+        self._status_cache = (0.0, None)
         
     def check_existing_instances(self) -> List[ProcessInfo]:
         """Find all existing Voxtral processes"""
+        if sys.platform.startswith('linux') and os.path.isdir('/proc'):
+            try:
+                return self._scan_linux_procs()
+            except Exception as e:
+                self.logger.debug(f"/proc scan failed, falling back to psutil: {e}")
+        
         instances = []
         
         try:
@@ -59,7 +125,8 @@ class ServiceManager:
                             name=proc_info['name'],
                             cmdline=cmdline,
                             port=None,  # We'll detect port later if needed
-                            start_time=proc_info['create_time']
+                            start_time=proc_info['create_time'],
+                            cmdline_str=cmdline_str
                         ))
                         
                 except (psutil.NoSuchProcess, psutil.AccessDenied, KeyError):
@@ -70,27 +137,30 @@ class ServiceManager:
             
         return instances
     
-    def _is_voxtral_process(self, cmdline: str, process_name: str) -> bool:
-        """Check if a process is a Voxtral process"""
-        voxtral_indicators = [
-            'voxtral_tray_gtk.py',
-            'voxtral_tray_unified.py',
-            'tray_icon.py',
-            'agent_main.py',
-            'voxtral-tray',
-            'VoxtralTrayGTK',
-            'VoxtralTrayApp',
-            'VoxtralTrayUnified'
-        ]
+    def _scan_linux_procs(self) -> List[ProcessInfo]:
+        """Find Voxtral processes by reading /proc directly"""
+        instances = []
         
-        cmdline_lower = cmdline.lower()
-        name_lower = process_name.lower() if process_name else ''
+        for pid, raw in _iter_linux_procs():
+            name = _read_proc_name(pid)
+            if not (_VOXTRAL_BYTES_RE.search(raw) or _VOXTRAL_RE.search(name)):
+                continue
+            
+            raw = raw.rstrip(b'\0')
+            instances.append(ProcessInfo(
+                pid=pid,
+                name=name,
+                cmdline=raw.decode('utf-8', 'replace').split('\0'),
+                port=None,
+                start_time=_read_proc_start_time(pid),
+                cmdline_str=raw.replace(b'\0', b' ').decode('utf-8', 'replace')
+            ))
         
-        for indicator in voxtral_indicators:
-            if indicator.lower() in cmdline_lower or indicator.lower() in name_lower:
-                return True
-                
-        return False
+        return instances
+    
+    def _is_voxtral_process(self, cmdline: str, process_name: str) -> bool:
+        """Check if a process is a Voxtral process"""
+        return bool(_VOXTRAL_RE.search(cmdline) or (process_name and _VOXTRAL_RE.search(process_name)))
     
     def terminate_duplicates(self, keep_newest: bool = True) -> bool:
         """Terminate duplicate instances, keeping the newest or oldest"""
@@ -190,6 +260,7 @@ WantedBy=default.target
             # Reload systemd and enable service
             subprocess.run(['systemctl', '--user', 'daemon-reload'], check=True)
             subprocess.run(['systemctl', '--user', 'enable', 'voxtral-tray.service'], check=True)
+            self._status_cache = (0.0, None)
             
             self.logger.info("Systemd autostart configured successfully")
             return True
@@ -243,11 +314,10 @@ Categories=Utility;AudioVideo;
     def _cleanup_systemd_autostart(self) -> bool:
         """Remove systemd autostart configuration"""
         try:
-            # Stop and disable service
-            subprocess.run(['systemctl', '--user', 'stop', 'voxtral-tray.service'], 
-                         capture_output=True)
-            subprocess.run(['systemctl', '--user', 'disable', 'voxtral-tray.service'], 
+            # Stop and disable service in one call
+            subprocess.run(['systemctl', '--user', 'disable', '--now', 'voxtral-tray.service'], 
                          capture_output=True)
+            self._status_cache = (0.0, None)
             
             # Remove service file
             service_file = Path.home() / ".config/systemd/user/voxtral-tray.service"
@@ -285,30 +355,39 @@ Categories=Utility;AudioVideo;
         return systemd_success and desktop_success
     
     def create_lock_file(self) -> bool:
-        """Create lock file to prevent multiple instances"""
+        """Create lock file to prevent multiple instances
+        
+        The file carries our PID for status output, but the lock itself is an
+        fcntl.flock held on it for the life of the process; the kernel drops it
+        when the process exits, so stale PIDs never need cleaning up.
+        """
+        if self._lock_fd is not None:
+            return True
+        
         try:
-            if self.lock_file.exists():
-                # Check if the PID in lock file is still running
+            while True:
+                fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
                 try:
-                    with open(self.lock_file, 'r') as f:
-                        old_pid = int(f.read().strip())
-                    
-                    if psutil.pid_exists(old_pid):
-                        proc = psutil.Process(old_pid)
-                        if self._is_voxtral_process(' '.join(proc.cmdline()), proc.name()):
-                            self.logger.warning(f"Lock file exists with running PID {old_pid}")
-                            return False
-                    
-                    # Old PID is dead, remove stale lock file
-                    self.lock_file.unlink()
-                    
-                except (ValueError, psutil.NoSuchProcess, psutil.AccessDenied):
-                    # Invalid or dead PID, remove lock file
-                    self.lock_file.unlink()
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    holder = os.read(fd, 32).decode(errors='replace').strip()
+                    os.close(fd)
+                    self.logger.warning(f"Lock file is held by running PID {holder or 'unknown'}")
+                    return False
+                
+                # A previous holder may have unlinked the file between our open
+                # and flock; only a lock on the file currently at the path counts
+                try:
+                    if os.stat(self.lock_file).st_ino == os.fstat(fd).st_ino:
+                        break
+                except FileNotFoundError:
+                    pass
+                os.close(fd)
             
-            # Create new lock file
-            with open(self.lock_file, 'w') as f:
-                f.write(str(os.getpid()))
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            os.fsync(fd)
+            self._lock_fd = fd
             
             self.logger.info(f"Created lock file with PID {os.getpid()}")
             return True
@@ -320,8 +399,11 @@ Categories=Utility;AudioVideo;
     def remove_lock_file(self) -> bool:
         """Remove lock file on shutdown"""
         try:
-            if self.lock_file.exists():
-                self.lock_file.unlink()
+            if self._lock_fd is not None:
+                # Unlink while still holding the lock so no one locks the old file
+                self.lock_file.unlink(missing_ok=True)
+                os.close(self._lock_fd)
+                self._lock_fd = None
                 self.logger.info("Removed lock file")
             return True
             
@@ -329,19 +411,31 @@ Categories=Utility;AudioVideo;
             self.logger.error(f"Failed to remove lock file: {e}")
             return False
     
-    def get_service_status(self) -> Dict[str, Any]:
-        """Get comprehensive service status"""
-        instances = self.check_existing_instances()
+    def _cached_systemctl(self, ttl: float = 2.0) -> str:
+        """systemd service state, re-queried at most once per ttl seconds"""
+        timestamp, value = self._status_cache
+        now = time.monotonic()
+        if value is not None and now - timestamp <= ttl:
+            return value
         
-        # Check systemd service status
-        systemd_status = "unknown"
+        value = "unknown"
         try:
             result = subprocess.run(['systemctl', '--user', 'is-active', 'voxtral-tray.service'],
                                   capture_output=True, text=True)
-            systemd_status = result.stdout.strip()
+            value = result.stdout.strip()
         except:
             pass
         
+        self._status_cache = (now, value)
+        return value
+    
+    def get_service_status(self) -> Dict[str, Any]:
+        """Get comprehensive service status"""
+        instances = self.check_existing_instances()
+        
+        # Check systemd service status
+        systemd_status = self._cached_systemctl()
+        
         # Check desktop autostart
         desktop_autostart = (Path.home() / ".config/autostart/voxtral-tray.desktop").exists()
         
@@ -361,7 +455,7 @@ Categories=Utility;AudioVideo;
                 {
                     "pid": inst.pid,
                     "name": inst.name,
-                    "cmdline": ' '.join(inst.cmdline),
+                    "cmdline": inst.cmdline_str,
                     "start_time": inst.start_time
                 }
                 for inst in instances
@@ -397,7 +491,7 @@ def main():
         instances = manager.check_existing_instances()
         print(f"Found {len(instances)} Voxtral instances:")
         for inst in instances:
-            print(f"  PID {inst.pid}: {inst.name} - {' '.join(inst.cmdline)}")
+            print(f"  PID {inst.pid}: {inst.name} - {inst.cmdline_str}")
     
     elif args.terminate_duplicates:
         success = manager.terminate_duplicates()
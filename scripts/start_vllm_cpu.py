@@ -50,7 +50,9 @@ def start_vllm_server(device_type="cpu", port=8000):
         "--port", str(port),
         "--tokenizer_mode", "mistral",
         "--config_format", "mistral",
-        "--load_format", "mistral"
+        "--load_format", "mistral",
+        # Reuse KV cache for the system prompt + tool schema shared by every request
+        "--enable_prefix_caching"
     ]
     
     # Add device-specific arguments
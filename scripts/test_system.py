@@ -205,7 +205,7 @@ def test_vllm_server():
                 
         except requests.exceptions.ConnectionError:
             print_test("VLLM Server", False, "Connection refused - server not running")
-            print("   Start with: vllm serve mistralai/Voxtral-Mini-3B-2507 --tokenizer_mode mistral --config_format mistral --load_format mistral")
+            print("   Start with: vllm serve mistralai/Voxtral-Mini-3B-2507 --tokenizer_mode mistral --config_format mistral --load_format mistral --enable_prefix_caching")
             return False
         except requests.exceptions.Timeout:
             print_test("VLLM Server", False, "Connection timeout")
@@ -17,6 +17,9 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
+# Temporary WAVs go to tmpfs when available so they never hit the disk
+TMP_DIR = "/dev/shm" if Path("/dev/shm").is_dir() else None
+
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -387,7 +390,7 @@ class VoxtralStableTray:
                 return
             
             # Save to temp file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=TMP_DIR) as temp_file:
                 sf.write(temp_file.name, audio_data, self.sample_rate)
                 temp_path = temp_file.name
             
@@ -572,7 +575,7 @@ class VoxtralStableTray:
                 return
             
             # Save and transcribe
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False, dir=TMP_DIR) as temp_file:
                 sf.write(temp_file.name, audio_data, self.sample_rate)
                 temp_path = temp_file.name
             